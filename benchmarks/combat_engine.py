@@ -0,0 +1,80 @@
+"""Throughput of the turn-based combat engine by party size.
+
+Every fight is a party against a boss that can neither die nor kill anyone,
+so each one runs the full ``MAX_TURNS``. Reports the time per fight and turns
+per second for ``resolve_fight`` and, with NumPy installed, for
+``resolve_batch``. Run from the repository root with
+``python -m benchmarks.combat_engine``.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import timeit
+
+from bot.models import Enemy, Player, RPGClass, Skill
+from bot.services.engine import MAX_TURNS, BatchParty, Combatant, resolve_batch, resolve_fight
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+
+def build_party(size: int) -> list[Combatant]:
+    rpg_class = RPGClass(1, "Sword Saint", "", 1.2, 1.1, 1.0, 1.05, 0.9, 1.4, 0.8)
+    skills = [
+        Skill(1, "Heavenly Cleave", "", "Tier 3", "physical", 40, 2.5),
+        Skill(2, "Qi Lance", "", "Tier 2", "spiritual", 25, 2.2),
+        Skill(3, "Dragon Fist", "", "Tier 1", "energy", 10, 1.5),
+    ]
+    party = []
+    for index in range(size):
+        player = Player(
+            id=index,
+            discord_id=index,
+            lurkr_level=40 + index,
+            coins=0,
+            experience=0,
+            rpg_class=rpg_class,
+            skills=skills,
+        )
+        party.append(Combatant.for_player(player))
+    return party
+
+
+def build_boss(party_size: int) -> Combatant:
+    boss = Enemy(1, "Ancient Turtle", "", 60, {"constitution": 1e12, "strength": 0, "spirit": 0}, {}, True)
+    return Combatant.for_enemy(boss, party_size)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4, 6, 8])
+    parser.add_argument("--number", type=int, default=2_000)
+    parser.add_argument("--batch", type=int, default=10_000, help="fights per resolve_batch call")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    print(f"{MAX_TURNS} turns per fight")
+    print(f"{'size':>4} {'us/fight':>10} {'turns/s':>12} {'batch turns/s':>15}")
+    for size in args.sizes:
+        party = build_party(size)
+        boss = build_boss(size)
+        result = resolve_fight(party, boss, rng)
+        assert result.turns == MAX_TURNS and not result.won
+        best = min(timeit.repeat(lambda: resolve_fight(party, boss, rng), number=args.number, repeat=5))
+        per_fight = best / args.number
+        batch_rate = "-"
+        if np is not None:
+            # Each member's profile is already at their level, so scale by one.
+            picks = np.tile(np.arange(size), (args.batch, 1))
+            batch = BatchParty.from_profiles(party, picks, np.ones((args.batch, size)))
+            batch_rng = np.random.default_rng(1)
+            elapsed = min(timeit.repeat(lambda: resolve_batch(batch, boss, batch_rng), number=1, repeat=3))
+            batch_rate = f"{args.batch * MAX_TURNS / elapsed:,.0f}"
+        print(f"{size:>4} {per_fight * 1e6:>10.1f} {MAX_TURNS / per_fight:>12,.0f} {batch_rate:>15}")
+
+
+if __name__ == "__main__":
+    main()
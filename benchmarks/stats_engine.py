@@ -0,0 +1,107 @@
+"""Microbenchmark for ``Player.calculate_stats``.
+
+Compares the compiled stat engine against the previous implementation, which
+rebuilt the alias and multiplier dicts and merged every modifier on each
+call. Run from the repository root with ``python -m benchmarks.stats_engine``.
+"""
+from __future__ import annotations
+
+import argparse
+import timeit
+
+from bot.models import Item, Player, RPGClass, Trait
+
+_LEGACY_ALIASES = {
+    "constitution": "constitution",
+    "hp": "constitution",
+    "agility": "agility",
+    "defense": "defense",
+    "endurance": "endurance",
+    "stamina": "endurance",
+    "attack": "strength",
+    "power": "strength",
+    "strength": "strength",
+    "dantian_size": "dantian_size",
+    "qi": "dantian_size",
+    "dantian": "dantian_size",
+    "spirit": "spirit",
+    "will": "spirit",
+    "magic": "spirit",
+    "mana": "spirit",
+    "intelligence": "spirit",
+}
+_ORDER = ("constitution", "agility", "defense", "endurance", "dantian_size", "strength", "spirit")
+
+
+def legacy_calculate_stats(player: Player) -> dict[str, float]:
+    base_stat = max(1, player.lurkr_level)
+    canonical_map = dict(_LEGACY_ALIASES)
+    multipliers = {key: 1.0 for key in _ORDER}
+
+    def apply_multiplier(key: str, value: float) -> None:
+        canonical = canonical_map.get(key, key)
+        multipliers[canonical] = multipliers.get(canonical, 1.0) * value
+
+    if player.rpg_class:
+        apply_multiplier("constitution", player.rpg_class.constitution_multiplier)
+        apply_multiplier("agility", player.rpg_class.agility_multiplier)
+        apply_multiplier("defense", player.rpg_class.defense_multiplier)
+        apply_multiplier("endurance", player.rpg_class.endurance_multiplier)
+        apply_multiplier("dantian_size", player.rpg_class.dantian_multiplier)
+        apply_multiplier("strength", player.rpg_class.strength_multiplier)
+        apply_multiplier("spirit", player.rpg_class.spirit_multiplier)
+    for trait in player.traits:
+        for key, value in trait.modifiers.items():
+            apply_multiplier(key, value)
+    for item in player.items:
+        for key, value in item.modifiers.items():
+            apply_multiplier(key, value)
+
+    ordered_stats = {key: base_stat * multipliers.get(key, 1.0) for key in _ORDER}
+    for key, mult in multipliers.items():
+        if key not in ordered_stats:
+            ordered_stats[key] = base_stat * mult
+    return ordered_stats
+
+
+def build_player(traits: int, items: int) -> Player:
+    rpg_class = RPGClass(1, "Sword Saint", "", 1.2, 1.1, 1.0, 1.05, 0.9, 1.4, 0.8)
+    return Player(
+        id=1,
+        discord_id=1,
+        lurkr_level=42,
+        coins=0,
+        experience=0,
+        rpg_class=rpg_class,
+        traits=[Trait(i, f"trait-{i}", "", {"hp": 1.05, "will": 1.02}) for i in range(traits)],
+        items=[
+            Item(i, f"item-{i}", "", "gear", 10, {"attack": 1.03, "defense": 1.01, "luck": 1.1})
+            for i in range(items)
+        ],
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--traits", type=int, default=3)
+    parser.add_argument("--items", type=int, default=8)
+    parser.add_argument("--number", type=int, default=50_000)
+    args = parser.parse_args()
+
+    player = build_player(args.traits, args.items)
+    expected = legacy_calculate_stats(player)
+    actual = player.calculate_stats().as_dict()
+    assert expected.keys() == actual.keys()
+    assert all(abs(expected[key] - actual[key]) < 1e-9 for key in expected)
+
+    legacy = min(timeit.repeat(lambda: legacy_calculate_stats(player), number=args.number, repeat=5))
+    compiled = min(timeit.repeat(player.calculate_stats, number=args.number, repeat=5))
+    per_call = 1e6 / args.number
+    print(f"loadout: {args.traits} traits, {args.items} items")
+    print(f"legacy   {legacy * per_call:8.2f} us/call")
+    print(f"compiled {compiled * per_call:8.2f} us/call")
+    print(f"speedup  {legacy / compiled:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,13 +8,18 @@
 
 from .config import Settings
 from .database import Database
+from .messaging import ChannelOutbox, RPGContext
+from .services.activity import ActivityService
 from .services.admin import AdminService
 from .services.combat import CombatService
+from .services.ledger import LedgerService
 from .services.lurkr import LurkrClient
+from .services.matchmaking import MatchmakingService
 from .services.parties import PartyService
 from .services.players import PlayerService
 from .services.quests import QuestService
 from .services.store import StoreService
+from .services.wallet import WalletService
 
 log = logging.getLogger(__name__)
 
@@ -26,17 +31,67 @@ def __init__(self, settings: Settings, intents: discord.Intents | None = None) -
         intents.members = True
         super().__init__(command_prefix="!", intents=intents)
         self.settings = settings
-        self.db = Database(settings.database_path)
-        self.lurkr = LurkrClient(settings.lurkr_api_base_url, settings.lurkr_api_token)
-        self.players = PlayerService(self.db, self.lurkr)
+        self.db = Database(
+            settings.database_path,
+            read_pool_size=settings.database_read_pool_size,
+            busy_timeout_ms=settings.database_busy_timeout_ms,
+            synchronous=settings.database_synchronous,
+            group_commit_window=settings.database_group_commit_ms / 1000,
+        )
+        self.lurkr = LurkrClient(
+            settings.lurkr_api_base_url,
+            settings.lurkr_api_token,
+            timeout=settings.lurkr_timeout,
+            connect_timeout=settings.lurkr_connect_timeout,
+            connection_limit=settings.lurkr_connection_limit,
+            rate_limit=settings.lurkr_rate_limit,
+            max_concurrency=settings.lurkr_max_concurrency,
+            max_retries=settings.lurkr_max_retries,
+        )
+        self.ledger = LedgerService(
+            self.db,
+            flush_size=settings.ledger_flush_size,
+            flush_interval=settings.ledger_flush_interval,
+            snapshot_interval=settings.ledger_snapshot_interval,
+            retention_days=settings.ledger_retention_days,
+        )
+        self.players = PlayerService(
+            self.db,
+            self.lurkr,
+            cache_size=settings.player_cache_size,
+            cache_ttl=settings.player_cache_ttl,
+            lurkr_sync_interval=settings.lurkr_sync_interval,
+            ledger=self.ledger,
+        )
+        self.wallet = WalletService(self.db, self.players, self.ledger)
+        self.chat_xp = ActivityService(
+            self.db,
+            self.players,
+            xp_per_message=settings.activity_xp_per_message,
+            cooldown=settings.activity_xp_cooldown,
+            flush_interval=settings.activity_flush_interval,
+        )
         self.parties = PartyService(self.db)
+        self.matchmaking = MatchmakingService(
+            self.parties,
+            party_size=settings.matchmaking_party_size,
+            level_band=settings.matchmaking_level_band,
+        )
         self.quests = QuestService(self.db)
         self.store = StoreService(self.db)
         self.admin = AdminService(self.db)
-        self.combat = CombatService(self.db)
+        self.combat = CombatService(self.db, replay_retention_days=settings.battle_replay_retention_days)
+        self.outbox = ChannelOutbox(burst=settings.message_burst, window=settings.message_window)
 
     async def setup_hook(self) -> None:
         await self.db.connect()
+        await self.lurkr.start()
+        await self.ledger.start()
+        await self.parties.load()
+        await self.chat_xp.start()
+        backfilled = await self.players.backfill_stats()
+        if backfilled:
+            log.info("Backfilled stored stats for %d players", backfilled)
         from .cogs import admin as admin_cog
         from .cogs import combat as combat_cog
         from .cogs import parties as parties_cog
@@ -53,8 +108,22 @@ async def setup_hook(self) -> None:
         synced = await self.tree.sync()
         log.info("Synced %d slash commands", len(synced))
 
+    async def get_context(
+        self,
+        origin: discord.Message | discord.Interaction,
+        /,
+        *,
+        cls: type[commands.Context] = RPGContext,
+    ) -> commands.Context:
+        # Prefix replies from every cog then share their channel's outbox queue.
+        return await super().get_context(origin, cls=cls)
+
     async def close(self) -> None:
         await super().close()
+        await self.chat_xp.close()
+        await self.players.close()
+        await self.ledger.close()
+        await self.lurkr.close()
         await self.db.close()
 
 
@@ -0,0 +1,174 @@
+"""In-process caching helpers shared by services."""
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+import time
+from typing import Awaitable, Callable, Generic, Hashable, Iterable, Iterator, Mapping, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Bounded mapping with least-recently-used eviction and per-entry expiry.
+
+    ``maxsize`` caps the number of entries; inserting past it evicts the least
+    recently used one. Entries older than ``ttl`` seconds are treated as
+    missing. A ``maxsize`` of zero disables the cache entirely.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if maxsize < 0:
+            raise ValueError("maxsize cannot be negative")
+        if ttl <= 0:
+            raise ValueError("ttl must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return self.peek(key) is not None  # type: ignore[arg-type]
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: K) -> V | None:
+        """Return a live entry without touching recency or the counters."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self._clock():
+            return None
+        return entry[1]
+
+    def put(self, key: K, value: V) -> None:
+        if not self.maxsize:
+            return
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: K) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def values(self) -> Iterator[V]:
+        """Iterate over live entries, oldest first."""
+        now = self._clock()
+        for expires_at, value in list(self._entries.values()):
+            if expires_at > now:
+                yield value
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SingleFlight(Generic[K, V]):
+    """Share one in-flight computation among concurrent callers for the same key.
+
+    The first caller for a key starts the work as a task; callers arriving
+    before it finishes await the same task instead of repeating the work. The
+    task is shielded, so one caller being cancelled does not cancel it for the
+    others.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[K, asyncio.Future[V]] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._calls
+
+    async def do(self, key: K, factory: Callable[[], Awaitable[V]]) -> V:
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(future)
+
+    async def do_many(
+        self,
+        keys: Iterable[K],
+        factory: Callable[[list[K]], Awaitable[Mapping[K, V]]],
+    ) -> dict[K, V]:
+        """Resolve many keys, batching the ones nobody is computing yet.
+
+        Keys already in flight are awaited as-is. The rest are handed to one
+        ``factory`` call, which must return a value for each key it receives.
+        """
+        waiting: dict[K, asyncio.Future[V]] = {}
+        pending: list[K] = []
+        for key in dict.fromkeys(keys):
+            future = self._calls.get(key)
+            if future is None:
+                pending.append(key)
+            else:
+                waiting[key] = future
+        if pending:
+            loop = asyncio.get_running_loop()
+            batch = asyncio.ensure_future(factory(pending))
+            owned: dict[K, asyncio.Future[V]] = {}
+            for key in pending:
+                future = loop.create_future()
+                self._calls[key] = future
+                future.add_done_callback(lambda done, key=key: self._forget(key, done))
+                owned[key] = future
+                waiting[key] = future
+            batch.add_done_callback(lambda done: self._settle(owned, done))
+        values = await asyncio.gather(*(asyncio.shield(future) for future in waiting.values()))
+        return dict(zip(waiting, values))
+
+    @staticmethod
+    def _settle(owned: Mapping[K, asyncio.Future[V]], batch: asyncio.Future[Mapping[K, V]]) -> None:
+        for key, future in owned.items():
+            if batch.cancelled():
+                future.cancel()
+            elif batch.exception() is not None:
+                future.set_exception(batch.exception())
+            elif key in batch.result():
+                future.set_result(batch.result()[key])
+            else:
+                future.set_exception(KeyError(key))
+
+    def _forget(self, key: K, future: asyncio.Future[V]) -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
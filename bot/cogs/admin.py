@@ -3,9 +3,12 @@
 
 import json
 
+import discord
 from discord import app_commands
 from discord.ext import commands
 
+from ..services.wallet import InvalidReward, format_amounts
+
 
 class AdminCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -28,7 +31,7 @@ async def _parse_modifiers(self, modifiers: str | None) -> dict[str, float]:
     @app_commands.default_permissions(administrator=True)
     async def admin_group(self, ctx: commands.Context) -> None:
         await ctx.send(
-            "Available subcommands: class, skill, trait, item, enemy, quest, currency."
+            "Available subcommands: class, skill, trait, item, enemy, quest, currency, coins, ledger, sync."
             " Use them via `/admin ...` or `!admin ...`."
         )
 
@@ -42,7 +45,8 @@ async def admin_group(self, ctx: commands.Context) -> None:
     @app_commands.default_permissions(administrator=True)
     async def admin_class(self, ctx: commands.Context) -> None:
         await ctx.send(
-            "Use `/admin class create <name> <constitution> <agility> <defense> <endurance> <dantian_size> <strength> <spirit> [description...]`."
+            "Use `/admin class create <name> <constitution> <agility> <defense> <endurance> <dantian_size> <strength> <spirit> [description...]`"
+            " or `/admin class update <class_id> <constitution> <agility> <defense> <endurance> <dantian_size> <strength> <spirit>`."
         )
 
     @admin_class.command(
@@ -79,6 +83,41 @@ async def class_create(
         )
         await ctx.send(f"Created class {name} with id {class_id}.")
 
+    @admin_class.command(
+        name="update",
+        with_app_command=True,
+        description="Change an RPG class's stat multipliers.",
+    )
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    async def class_update(
+        self,
+        ctx: commands.Context,
+        class_id: int,
+        constitution: float,
+        agility: float,
+        defense: float,
+        endurance: float,
+        dantian_size: float,
+        strength: float,
+        spirit: float,
+    ) -> None:
+        updated = await self.bot.admin.update_class_multipliers(
+            class_id,
+            constitution,
+            agility,
+            defense,
+            endurance,
+            dantian_size,
+            strength,
+            spirit,
+        )
+        if not updated:
+            await ctx.send("Class not found.")
+            return
+        refreshed = await self.bot.players.refresh_stats_for_content(class_id=class_id)
+        await ctx.send(f"Updated class {class_id}; refreshed stats for {refreshed} players.")
+
     @admin_group.group(
         name="skill",
         invoke_without_command=True,
@@ -146,7 +185,10 @@ async def skill_assign(self, ctx: commands.Context, class_id: int, skill_id: int
     @commands.has_permissions(administrator=True)
     @app_commands.default_permissions(administrator=True)
     async def admin_trait(self, ctx: commands.Context) -> None:
-        await ctx.send("Use `/admin trait create <name> <json_modifiers> [description...]`.")
+        await ctx.send(
+            "Use `/admin trait create <name> <json_modifiers> [description...]`,"
+            " `/admin trait update <trait_id> <json_modifiers>`, or `/admin trait grant <member> <trait_id>`."
+        )
 
     @admin_trait.command(
         name="create",
@@ -160,6 +202,38 @@ async def trait_create(self, ctx: commands.Context, name: str, modifiers: str, *
         trait_id = await self.bot.admin.create_trait(name, description, mod_data)
         await ctx.send(f"Created trait {name} with id {trait_id}.")
 
+    @admin_trait.command(
+        name="update",
+        with_app_command=True,
+        description="Replace a trait's stat modifiers.",
+    )
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    async def trait_update(self, ctx: commands.Context, trait_id: int, modifiers: str) -> None:
+        mod_data = await self._parse_modifiers(modifiers)
+        if not await self.bot.admin.update_trait_modifiers(trait_id, mod_data):
+            await ctx.send("Trait not found.")
+            return
+        refreshed = await self.bot.players.refresh_stats_for_content(trait_id=trait_id)
+        await ctx.send(f"Updated trait {trait_id}; refreshed stats for {refreshed} players.")
+
+    @admin_trait.command(
+        name="grant",
+        with_app_command=True,
+        description="Grant a trait to a member.",
+    )
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    async def trait_grant(self, ctx: commands.Context, member: discord.Member, trait_id: int) -> None:
+        if not await self.bot.db.fetch_one("SELECT id FROM traits WHERE id = ?", trait_id):
+            await ctx.send("Trait not found.")
+            return
+        player = await self.bot.players.ensure_player(member.id)
+        if not await self.bot.players.grant_trait(player, trait_id):
+            await ctx.send(f"{member.display_name} already has trait {trait_id}.")
+            return
+        await ctx.send(f"Granted trait {trait_id} to {member.display_name}.")
+
     @admin_group.group(
         name="item",
         invoke_without_command=True,
@@ -169,7 +243,10 @@ async def trait_create(self, ctx: commands.Context, name: str, modifiers: str, *
     @commands.has_permissions(administrator=True)
     @app_commands.default_permissions(administrator=True)
     async def admin_item(self, ctx: commands.Context) -> None:
-        await ctx.send("Use `/admin item create <name> <type> <price> <json_modifiers> [description...]`.")
+        await ctx.send(
+            "Use `/admin item create <name> <type> <price> <json_modifiers> [description...]`"
+            ", `/admin item update <item_id> <json_modifiers>` or `/admin item price <item_id> <price> [currency_id]`."
+        )
 
     @admin_item.command(
         name="create",
@@ -192,6 +269,41 @@ async def item_create(
         item_id = await self.bot.admin.create_item(name, description, item_type, price, mod_data)
         await ctx.send(f"Created item {name} with id {item_id}.")
 
+    @admin_item.command(
+        name="update",
+        with_app_command=True,
+        description="Replace an item's stat modifiers.",
+    )
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    async def item_update(self, ctx: commands.Context, item_id: int, modifiers: str) -> None:
+        mod_data = await self._parse_modifiers(modifiers)
+        if not await self.bot.admin.update_item_modifiers(item_id, mod_data):
+            await ctx.send("Item not found.")
+            return
+        refreshed = await self.bot.players.refresh_stats_for_content(item_id=item_id)
+        await ctx.send(f"Updated item {item_id}; refreshed stats for {refreshed} players.")
+
+    @admin_item.command(
+        name="price",
+        with_app_command=True,
+        description="Set an item's store price and currency (0 for coins).",
+    )
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    async def item_price(self, ctx: commands.Context, item_id: int, price: int, currency_id: int = 0) -> None:
+        if price < 0:
+            await ctx.send("Price cannot be negative.")
+            return
+        names = await self.bot.wallet.list_currencies()
+        if currency_id and currency_id not in names:
+            await ctx.send("Currency not found.")
+            return
+        if not await self.bot.admin.update_item_price(item_id, price, currency_id):
+            await ctx.send("Item not found.")
+            return
+        await ctx.send(f"Item {item_id} now costs {format_amounts({currency_id: price}, names)}.")
+
     @admin_group.group(
         name="enemy",
         invoke_without_command=True,
@@ -201,7 +313,11 @@ async def item_create(
     @commands.has_permissions(administrator=True)
     @app_commands.default_permissions(administrator=True)
     async def admin_enemy(self, ctx: commands.Context) -> None:
-        await ctx.send("Use `/admin enemy create <name> <level> <json_stats> <json_rewards> [description...]`.")
+        await ctx.send(
+            "Use `/admin enemy create <name> <level> <json_stats> <json_rewards> [description...]`"
+            ", `/admin enemy update <enemy_id> <level> <json_stats>`"
+            " or `/admin enemy simulate <enemy_id> [class_id] [trials] [level_spread]`."
+        )
 
     @admin_enemy.command(
         name="create",
@@ -222,9 +338,70 @@ async def enemy_create(
     ) -> None:
         stats_data = await self._parse_modifiers(stats)
         rewards_data = await self._parse_modifiers(rewards)
-        enemy_id = await self.bot.admin.create_enemy(name, description, level, stats_data, rewards_data, is_boss=False)
+        try:
+            enemy_id = await self.bot.admin.create_enemy(
+                name, description, level, stats_data, rewards_data, is_boss=False
+            )
+        except InvalidReward as exc:
+            await ctx.send(str(exc))
+            return
         await ctx.send(f"Created enemy {name} with id {enemy_id}.")
 
+    @admin_enemy.command(
+        name="update",
+        with_app_command=True,
+        description="Replace an enemy's level and stats.",
+    )
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    async def enemy_update(self, ctx: commands.Context, enemy_id: int, level: int, stats: str) -> None:
+        stats_data = await self._parse_modifiers(stats)
+        if not await self.bot.admin.update_enemy_stats(enemy_id, level, stats_data):
+            await ctx.send("Enemy not found.")
+            return
+        await ctx.send(f"Updated enemy {enemy_id}; earlier battles against it can no longer be replayed.")
+
+    @admin_enemy.command(
+        name="simulate",
+        with_app_command=True,
+        description="Estimate win rates against an enemy by party size and level.",
+    )
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    async def enemy_simulate(
+        self,
+        ctx: commands.Context,
+        enemy_id: int,
+        class_id: int | None = None,
+        trials: int = 10_000,
+        level_spread: int = 0,
+    ) -> None:
+        enemy = await self.bot.combat.fetch_enemy(enemy_id)
+        if not enemy:
+            await ctx.send("Enemy not found.")
+            return
+        await ctx.defer()
+        try:
+            cells = await self.bot.combat.simulate(
+                enemy,
+                class_id=class_id,
+                trials=max(1, min(trials, 100_000)),
+                level_spread=max(0, level_spread),
+            )
+        except ValueError as exc:
+            await ctx.send(str(exc))
+            return
+        levels = sorted({cell.level for cell in cells})
+        sizes = sorted({cell.party_size for cell in cells})
+        rates = {(cell.party_size, cell.level): cell.win_rate for cell in cells}
+        lines = ["Size " + "".join(f"{f'Lv {level}':>9}" for level in levels)]
+        for size in sizes:
+            lines.append(f"{size:>4} " + "".join(f"{rates[size, level]:>9.1%}" for level in levels))
+        await ctx.send(
+            f"Win rates against {enemy.name} (Lv {enemy.level}), {cells[0].class_name},"
+            f" {cells[0].trials:,} battles per cell:\n```\n" + "\n".join(lines) + "\n```"
+        )
+
     @admin_enemy.command(
         name="boss",
         with_app_command=True,
@@ -244,7 +421,13 @@ async def enemy_boss(
     ) -> None:
         stats_data = await self._parse_modifiers(stats)
         rewards_data = await self._parse_modifiers(rewards)
-        enemy_id = await self.bot.admin.create_enemy(name, description, level, stats_data, rewards_data, is_boss=True)
+        try:
+            enemy_id = await self.bot.admin.create_enemy(
+                name, description, level, stats_data, rewards_data, is_boss=True
+            )
+        except InvalidReward as exc:
+            await ctx.send(str(exc))
+            return
         await ctx.send(f"Created boss {name} with id {enemy_id}.")
 
     @admin_group.group(
@@ -275,7 +458,11 @@ async def quest_create(
         description: str = "",
     ) -> None:
         reward_data = await self._parse_modifiers(rewards)
-        quest_id = await self.bot.admin.create_quest(name, description, level, reward_data)
+        try:
+            quest_id = await self.bot.admin.create_quest(name, description, level, reward_data)
+        except InvalidReward as exc:
+            await ctx.send(str(exc))
+            return
         await ctx.send(f"Created quest {name} with id {quest_id}.")
 
     @admin_group.group(
@@ -306,3 +493,81 @@ async def currency_create(
     ) -> None:
         currency_id = await self.bot.admin.create_currency(name, description, is_premium)
         await ctx.send(f"Created currency {name} with id {currency_id}.")
+
+    @admin_group.command(
+        name="coins",
+        with_app_command=True,
+        description="Grant coins to a member, or deduct them with a negative amount.",
+    )
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    async def coins_grant(self, ctx: commands.Context, member: discord.Member, amount: int) -> None:
+        player = await self.bot.players.ensure_player(member.id)
+        reason = f"admin:{ctx.author.id}"
+        if amount < 0:
+            if not await self.bot.players.spend_coins(player, -amount, reason=reason):
+                await ctx.send(f"{member.display_name} only has {player.coins} coins.")
+                return
+        else:
+            await self.bot.players.add_coins(player, amount, reason=reason)
+        await ctx.send(f"{member.display_name} now has {player.coins} coins.")
+
+    @admin_group.group(
+        name="ledger",
+        invoke_without_command=True,
+        with_app_command=True,
+        description="Audit coin movements.",
+    )
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    async def admin_ledger(self, ctx: commands.Context) -> None:
+        await ctx.send("Use `/admin ledger history <member>` or `/admin ledger reconcile`.")
+
+    @admin_ledger.command(
+        name="history",
+        with_app_command=True,
+        description="Show a member's most recent ledger entries.",
+    )
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    async def ledger_history(self, ctx: commands.Context, member: discord.Member) -> None:
+        player = await self.bot.players.ensure_player(member.id)
+        entries = await self.bot.ledger.history(player.id)
+        if not entries:
+            await ctx.send(f"No ledger entries for {member.display_name}.")
+            return
+        lines = [
+            f"#{entry['id']} {entry['amount']:+d} (currency {entry['currency_id']}) {entry['reason']}"
+            for entry in entries
+        ]
+        await ctx.send(f"Ledger for {member.display_name}:\n" + "\n".join(lines))
+
+    @admin_ledger.command(
+        name="reconcile",
+        with_app_command=True,
+        description="List coin balances that disagree with the ledger.",
+    )
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    async def ledger_reconcile(self, ctx: commands.Context) -> None:
+        await ctx.defer()
+        mismatches = await self.bot.ledger.reconcile()
+        if not mismatches:
+            await ctx.send("All coin balances match the ledger.")
+            return
+        lines = [
+            f"<@{row['discord_id']}>: stored {row['stored']}, ledger {row['ledger']}" for row in mismatches
+        ]
+        await ctx.send("Ledger mismatches:\n" + "\n".join(lines))
+
+    @admin_group.command(
+        name="sync",
+        with_app_command=True,
+        description="Refresh Lurkr levels for every registered player.",
+    )
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    async def sync_levels(self, ctx: commands.Context) -> None:
+        await ctx.defer()
+        synced = await self.bot.players.sync_all_levels()
+        await ctx.send(f"Refreshed Lurkr levels for {synced} players.")
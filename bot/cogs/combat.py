@@ -4,6 +4,9 @@
 import discord
 from discord.ext import commands
 
+from ..messaging import ResponseBuilder
+from ..services.wallet import InvalidReward, check_rewards, format_amounts
+
 
 class CombatCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -11,43 +14,88 @@ def __init__(self, bot: commands.Bot):
 
     async def _collect_party_players(self, leader: discord.Member) -> list:
         player = await self.bot.players.ensure_player(leader.id)
-        membership = await self.bot.db.fetch_one(
-            "SELECT party_id FROM party_members WHERE user_id = ?",
-            player.id,
+        party_id = self.bot.parties.party_of(player.id)
+        if party_id is None:
+            return [player]
+        others = [
+            discord_id for discord_id in self.bot.parties.member_discord_ids(party_id) if discord_id != leader.id
+        ]
+        return [player, *await self.bot.players.ensure_players(others)]
+
+    @commands.hybrid_group(name="battle", invoke_without_command=True, description="Fight enemies and replay battles.")
+    async def battle_group(self, ctx: commands.Context, enemy_id: int | None = None) -> None:
+        # ``!battle <enemy_id>`` predates the subcommands and still starts a fight.
+        if enemy_id is not None:
+            await self._fight(ctx, enemy_id)
+            return
+        await ctx.send(
+            "Use `/battle fight <enemy_id>` to fight with your party, or `/battle replay <replay_id>`"
+            " to play a recorded battle again (commands also available with `!`)."
         )
-        players = [player]
-        if membership:
-            party_id = membership["party_id"]
-            member_rows = await self.bot.db.fetch_all(
-                "SELECT u.discord_id FROM party_members pm JOIN users u ON u.id = pm.user_id WHERE pm.party_id = ?",
-                party_id,
-            )
-            for row in member_rows:
-                if row["discord_id"] == leader.id:
-                    continue
-                players.append(await self.bot.players.ensure_player(row["discord_id"]))
-        return players
-
-    @commands.hybrid_command(name="battle", description="Battle an enemy by ID, optionally with your party.")
+
+    @battle_group.command(
+        name="fight",
+        with_app_command=True,
+        description="Battle an enemy by ID, optionally with your party.",
+    )
     async def battle(self, ctx: commands.Context, enemy_id: int) -> None:
+        await self._fight(ctx, enemy_id)
+
+    async def _fight(self, ctx: commands.Context, enemy_id: int) -> None:
         players = await self._collect_party_players(ctx.author)
         enemy = await self.bot.combat.fetch_enemy(enemy_id)
         if not enemy:
             await ctx.send("Enemy not found. Ask an admin to create it first.")
             return
         result = await self.bot.combat.battle(players, enemy)
-        for line in result.log:
-            await ctx.send(line)
+        response = ResponseBuilder().lines(result.log)
         if result.success and result.rewards:
-            coins = result.rewards.get("coins", 0)
-            items = result.rewards.get("items", [])
-            share = coins // len(players) if coins else 0
-            for player in players:
-                if share:
-                    await self.bot.players.add_coins(player, share)
-                for item_id in items:
-                    await self.bot.players.grant_item(player, item_id)
-            summary = f"Each party member receives {share} coins" if share else "Rewards distributed"
-            if items:
-                summary += f" and items {items}"
-            await ctx.send(summary)
+            try:
+                # Check the payload first: a bad item ID would otherwise fail
+                # the payout transaction after the battle is already recorded.
+                amounts, items = await check_rewards(self.bot.db, result.rewards)
+                shares = {
+                    currency_id: amount // len(players)
+                    for currency_id, amount in amounts.items()
+                    if amount // len(players)
+                }
+                async with self.bot.db.transaction():
+                    if shares:
+                        await self.bot.wallet.credit_many(
+                            [(player, shares) for player in players], reason=f"battle:{enemy.id}"
+                        )
+                    if items:
+                        await self.bot.players.grant_items_bulk(
+                            [(player.id, item_id, 1) for player in players for item_id in items]
+                        )
+            except InvalidReward as exc:
+                response.line(f"Rewards could not be paid out: {exc} Ask an admin to fix this enemy.")
+            else:
+                if shares:
+                    names = await self.bot.wallet.list_currencies()
+                    summary = f"Each party member receives {format_amounts(shares, names)}"
+                else:
+                    summary = "Rewards distributed"
+                if items:
+                    summary += f" and items {items}"
+                response.line(summary)
+        response.line(f"Replay #{result.replay_id} recorded.")
+        await response.send(ctx, self.bot.outbox)
+
+    @battle_group.command(name="replay", with_app_command=True, description="Play a recorded battle again.")
+    async def replay(self, ctx: commands.Context, replay_id: int) -> None:
+        try:
+            record, result = await self.bot.combat.replay(replay_id)
+        except ValueError as exc:
+            await ctx.send(str(exc))
+            return
+        response = ResponseBuilder().line(
+            f"Replay #{record.id} from <t:{int(record.created_at)}:f>, seed {record.seed},"
+            f" party of {len(record.user_ids)}:"
+        )
+        response.lines(result.log)
+        if (result.success, result.turns) == (record.success, record.turns):
+            response.line("The replay matches the recorded outcome.")
+        else:
+            response.line("The replay does not match the recorded outcome.")
+        await response.send(ctx, self.bot.outbox)
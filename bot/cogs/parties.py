@@ -14,64 +14,91 @@ async def _require_player(self, member: discord.Member | discord.User):
 
     @commands.hybrid_group(name="party", invoke_without_command=True, description="Manage your adventuring party.")
     async def party_group(self, ctx: commands.Context) -> None:
-        await ctx.send("Use `/party create`, `/party join`, or `/party leave` (commands also available with `!`).")
+        await ctx.send(
+            "Use `/party create`, `/party join`, `/party leave`, or `/party queue` to be matched with players"
+            " of a similar level (commands also available with `!`)."
+        )
 
     @party_group.command(name="create", with_app_command=True, description="Create a new party with the given name.")
     async def create_party(self, ctx: commands.Context, *, name: str) -> None:
         player = await self._require_player(ctx.author)
-        record = await self.bot.db.fetch_one(
-            "SELECT party_id FROM party_members WHERE user_id = ?",
-            player.id,
-        )
-        if record:
-            await ctx.send("You are already in a party.")
+        try:
+            party_id = await self.bot.parties.create_party(player, name)
+        except ValueError as exc:
+            await ctx.send(str(exc))
             return
-        party_id = await self.bot.parties.create_party(player.id, name)
+        self.bot.matchmaking.dequeue(player.id)
         await ctx.send(f"Created party `{name}` with ID {party_id}.")
 
     @party_group.command(name="join", with_app_command=True, description="Join a party by its ID.")
     async def join_party(self, ctx: commands.Context, party_id: int) -> None:
         player = await self._require_player(ctx.author)
-        if not await self.bot.db.fetch_one("SELECT id FROM parties WHERE id = ?", party_id):
-            await ctx.send("Party not found.")
+        try:
+            await self.bot.parties.join_party(party_id, player)
+        except ValueError as exc:
+            await ctx.send(str(exc))
             return
-        await self.bot.parties.join_party(party_id, player.id)
+        self.bot.matchmaking.dequeue(player.id)
         await ctx.send(f"Joined party {party_id}.")
 
     @party_group.command(name="leave", with_app_command=True, description="Leave your current party.")
     async def leave_party(self, ctx: commands.Context) -> None:
         player = await self._require_player(ctx.author)
-        membership = await self.bot.db.fetch_one(
-            "SELECT party_id FROM party_members WHERE user_id = ?",
-            player.id,
-        )
-        if not membership:
-            await ctx.send("You are not in a party.")
+        try:
+            _, disbanded = await self.bot.parties.leave_party(player)
+        except ValueError as exc:
+            await ctx.send(str(exc))
             return
-        party_id = membership["party_id"]
-        await self.bot.parties.leave_party(party_id, player.id)
-        remaining = await self.bot.parties.list_members(party_id)
-        if not remaining:
-            await self.bot.parties.disband_party(party_id)
+        if disbanded:
             await ctx.send("You left the party. It has been disbanded because it became empty.")
         else:
             await ctx.send("You left the party.")
 
+    @party_group.command(name="queue", with_app_command=True, description="Queue up to be matched into a party.")
+    async def queue(self, ctx: commands.Context) -> None:
+        player = await self._require_player(ctx.author)
+        try:
+            match = await self.bot.matchmaking.enqueue(player)
+        except ValueError as exc:
+            await ctx.send(str(exc))
+            return
+        if match is None:
+            band = self.bot.matchmaking.band_of(player)
+            low, high = self.bot.matchmaking.band_range(band)
+            waiting = self.bot.matchmaking.queued_in_band(band)
+            await ctx.send(
+                f"Queued for a party with players of level {low}-{high}"
+                f" ({waiting}/{self.bot.matchmaking.party_size} waiting)."
+            )
+            return
+        mentions = ", ".join(f"<@{member.discord_id}>" for member in match.players)
+        await ctx.send(f"Party {match.party_id} formed: {mentions}. Good luck!")
+
+    @party_group.command(name="unqueue", with_app_command=True, description="Leave the matchmaking queue.")
+    async def unqueue(self, ctx: commands.Context) -> None:
+        player = await self._require_player(ctx.author)
+        if not self.bot.matchmaking.dequeue(player.id):
+            await ctx.send("You are not in the matchmaking queue.")
+            return
+        await ctx.send("You left the matchmaking queue.")
+
+    @party_group.command(name="queuestats", with_app_command=True, description="Show matchmaking queue metrics.")
+    async def queue_stats(self, ctx: commands.Context) -> None:
+        stats = self.bot.matchmaking.stats()
+        await ctx.send(
+            f"Queued: {stats['queued']} across {stats['bands']} level bands\n"
+            f"Parties formed: {stats['parties_formed']} ({stats['players_matched']} players)\n"
+            f"Wait: avg {stats['average_wait']:.0f}s, p95 {stats['p95_wait']:.0f}s, max {stats['max_wait']:.0f}s"
+        )
+
     @party_group.command(name="members", with_app_command=True, description="List members of a party by ID.")
     async def members(self, ctx: commands.Context, party_id: int) -> None:
-        rows = await self.bot.db.fetch_all(
-            """
-            SELECT u.discord_id FROM party_members pm
-            JOIN users u ON u.id = pm.user_id
-            WHERE pm.party_id = ?
-            """,
-            party_id,
-        )
-        if not rows:
+        discord_ids = self.bot.parties.member_discord_ids(party_id)
+        if not discord_ids:
             await ctx.send("Party not found or empty.")
             return
         mentions = []
-        for row in rows:
-            member = ctx.guild.get_member(row["discord_id"]) if ctx.guild else None
-            mentions.append(member.mention if member else f"<@{row['discord_id']}>")
+        for discord_id in discord_ids:
+            member = ctx.guild.get_member(discord_id) if ctx.guild else None
+            mentions.append(member.mention if member else f"<@{discord_id}>")
         await ctx.send(f"Party {party_id} members: {', '.join(mentions)}")
@@ -4,6 +4,8 @@
 import discord
 from discord.ext import commands
 
+from ..services.wallet import InvalidReward, check_rewards, format_amounts
+
 
 class QuestCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -49,16 +51,18 @@ async def quest_accept(self, ctx: commands.Context, quest_id: int) -> None:
     async def quest_complete(self, ctx: commands.Context, quest_id: int) -> None:
         player = await self._ensure_player(ctx.author)
         try:
-            rewards = await self.bot.quests.complete(player.id, quest_id)
+            async with self.bot.db.transaction():
+                rewards = await self.bot.quests.complete(player.id, quest_id)
+                amounts, items = await check_rewards(self.bot.db, rewards)
+                await self.bot.wallet.credit(player, amounts, reason=f"quest:{quest_id}")
+                await self.bot.players.grant_items_bulk([(player.id, item_id, 1) for item_id in items])
+        except InvalidReward as exc:
+            await ctx.send(f"This quest's rewards cannot be paid out: {exc} Ask an admin to fix the quest.")
+            return
         except ValueError:
             await ctx.send("Quest not found.")
             return
-        coins = rewards.get("coins", 0)
-        if coins:
-            await self.bot.players.add_coins(player, coins)
-        items = rewards.get("items", [])
-        for item_id in items:
-            await self.bot.players.grant_item(player, item_id)
+        names = await self.bot.wallet.list_currencies()
         await ctx.send(
-            f"Quest completed! Rewards: {coins} coins" + (f", Items: {items}" if items else "")
+            f"Quest completed! Rewards: {format_amounts(amounts, names)}" + (f", Items: {items}" if items else "")
         )
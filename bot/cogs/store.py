@@ -4,6 +4,8 @@
 import discord
 from discord.ext import commands
 
+from ..services.wallet import format_amounts
+
 
 class StoreCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -22,11 +24,12 @@ async def store_list(self, ctx: commands.Context) -> None:
         if not items:
             await ctx.send("The store is empty. Check back later!")
             return
+        names = await self.bot.wallet.list_currencies()
         embed = discord.Embed(title="Store", color=discord.Color.purple())
         for item in items:
             modifiers = ", ".join(f"{k.title()} x{v}" for k, v in item.modifiers.items()) or "No modifiers"
             embed.add_field(
-                name=f"[{item.id}] {item.name} - {item.price} coins",
+                name=f"[{item.id}] {item.name} - {format_amounts({item.currency_id: item.price}, names)}",
                 value=f"{item.description}\n{modifiers}",
                 inline=False,
             )
@@ -39,8 +42,14 @@ async def store_buy(self, ctx: commands.Context, item_id: int) -> None:
         if not item:
             await ctx.send("Item not found.")
             return
-        if not await self.bot.players.spend_coins(player, item.price):
+        async with self.bot.db.transaction():
+            purchased = await self.bot.wallet.debit(
+                player, {item.currency_id: item.price}, reason=f"store:{item.id}"
+            )
+            if purchased:
+                await self.bot.players.grant_item(player, item.id)
+        if not purchased:
             await ctx.send("You cannot afford this item.")
             return
-        await self.bot.players.grant_item(player, item.id)
-        await ctx.send(f"Purchased {item.name} for {item.price} coins.")
+        names = await self.bot.wallet.list_currencies()
+        await ctx.send(f"Purchased {item.name} for {format_amounts({item.currency_id: item.price}, names)}.")
@@ -1,16 +1,52 @@
 """Cog exposing player utilities."""
 from __future__ import annotations
 
+import logging
+
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 
+from ..leveling import level_progress
+from ..messaging import ResponseBuilder
 from ..models import Player
 
 
+log = logging.getLogger(__name__)
+
+
 class UsersCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    async def cog_load(self) -> None:
+        interval = self.bot.settings.lurkr_bulk_sync_interval
+        if interval > 0:
+            self.sync_levels_loop.change_interval(seconds=interval)
+            self.sync_levels_loop.start()
+
+    async def cog_unload(self) -> None:
+        self.sync_levels_loop.cancel()
+
+    @tasks.loop(hours=1)
+    async def sync_levels_loop(self) -> None:
+        # An unhandled exception would stop the loop until the next restart.
+        try:
+            synced = await self.bot.players.sync_all_levels()
+        except Exception:  # noqa: BLE001
+            log.exception("Bulk Lurkr sync failed")
+            return
+        log.info("Bulk Lurkr sync refreshed %d players", synced)
+
+    @sync_levels_loop.before_loop
+    async def before_sync_levels(self) -> None:
+        await self.bot.wait_until_ready()
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message) -> None:
+        if message.author.bot or message.guild is None:
+            return
+        self.bot.chat_xp.record_message(message.author.id)
+
     async def _ensure_player(self, member: discord.Member | discord.User) -> Player:
         return await self.bot.players.ensure_player(member.id)
 
@@ -21,7 +57,14 @@ async def profile(self, ctx: commands.Context) -> None:
         stats = player.calculate_stats()
         embed = discord.Embed(title=f"{ctx.author.display_name}'s RPG Profile", color=discord.Color.gold())
         embed.add_field(name="Lurkr Level", value=str(player.lurkr_level))
+        experience = player.experience + self.bot.chat_xp.pending_xp(player.discord_id)
+        level, into, needed = level_progress(experience)
+        embed.add_field(
+            name="Activity Level",
+            value=f"{level} ({into}/{needed} XP)" if needed else f"{level} (max)",
+        )
         embed.add_field(name="Coins", value=str(player.coins))
+        embed.add_field(name="Combat Power", value=f"{stats.combat_power:.0f}")
         embed.add_field(
             name="Class",
             value=player.rpg_class.name if player.rpg_class else "Unassigned",
@@ -47,6 +90,31 @@ async def profile(self, ctx: commands.Context) -> None:
             )
         await ctx.send(embed=embed)
 
+    @commands.hybrid_command(name="wallet", description="Show your balance in every currency.")
+    async def wallet(self, ctx: commands.Context) -> None:
+        player = await self._ensure_player(ctx.author)
+        names = await self.bot.wallet.list_currencies()
+        embed = discord.Embed(title=f"{ctx.author.display_name}'s Wallet", color=discord.Color.gold())
+        embed.add_field(name="Coins", value=str(player.coins))
+        # Embeds hold at most 25 fields.
+        for currency_id, name in list(names.items())[:24]:
+            embed.add_field(name=name, value=str(player.wallet.get(currency_id, 0)))
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="leaderboard", description="Show the strongest players by combat power.")
+    async def leaderboard(self, ctx: commands.Context, limit: int = 10) -> None:
+        rows = await self.bot.players.leaderboard(max(1, min(limit, 25)))
+        if not rows:
+            await ctx.send("No players have been ranked yet.")
+            return
+        lines = []
+        for rank, row in enumerate(rows, start=1):
+            member = ctx.guild.get_member(row["discord_id"]) if ctx.guild else None
+            name = member.display_name if member else f"<@{row['discord_id']}>"
+            lines.append(f"{rank}. {name} - {row['combat_power']:.0f} power (Lv {row['lurkr_level']})")
+        embed = discord.Embed(title="Leaderboard", description="\n".join(lines), color=discord.Color.red())
+        await ctx.send(embed=embed)
+
     @commands.hybrid_command(name="sync", description="Sync your Lurkr level with the game data.")
     async def sync(self, ctx: commands.Context) -> None:
         """Force refresh of Lurkr level."""
@@ -115,48 +183,46 @@ async def list_commands(self, ctx: commands.Context) -> None:
             await ctx.send("No commands are currently available.")
             return
 
-        message_chunks = []
+        response = ResponseBuilder()
         for cog_name in sorted(command_entries):
-            entries = "\n".join(command_entries[cog_name])
-            chunk = f"**{cog_name} Commands**\n{entries}"
-            message_chunks.append(chunk)
-
-        output = "\n\n".join(message_chunks)
-        if len(output) <= 2000:
-            await ctx.send(output)
-            return
-
-        # Fallback to sending in multiple messages if we exceed Discord's limit
-        for chunk in message_chunks:
-            if len(chunk) <= 2000:
-                await ctx.send(chunk)
-                continue
-
-            partial = ""
-            for line in chunk.split("\n"):
-                addition = line if not partial else f"\n{line}"
-                if len(partial) + len(addition) > 2000:
-                    if partial:
-                        await ctx.send(partial)
-                    partial = line
-                else:
-                    partial += addition
-            if partial:
-                await ctx.send(partial)
+            response.line(f"**{cog_name} Commands**").lines(command_entries[cog_name]).line("")
+        await response.send(ctx, self.bot.outbox)
 
     @commands.hybrid_command(name="inventory", description="Show the items in your inventory.")
     async def inventory(self, ctx: commands.Context) -> None:
         player = await self._ensure_player(ctx.author)
-        items = await self.bot.players.list_inventory(player)
-        if not items:
+        entries = await self.bot.players.list_inventory(player)
+        if not entries:
             await ctx.send("Your inventory is empty.")
             return
         embed = discord.Embed(title="Inventory", color=discord.Color.blurple())
-        for item in items:
+        for entry in entries:
+            item = entry.item
             mods = ", ".join(f"{k.title()} x{v}" for k, v in item.modifiers.items()) or "No modifiers"
+            status = " (equipped)" if entry.equipped else ""
             embed.add_field(
-                name=f"[{item.id}] {item.name}",
+                name=f"[{item.id}] {item.name} x{entry.quantity}{status}",
                 value=f"{item.description}\nType: {item.item_type}\nModifiers: {mods}",
                 inline=False,
             )
         await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="equip", description="Equip an item from your inventory.")
+    async def equip(self, ctx: commands.Context, item_id: int) -> None:
+        player = await self._ensure_player(ctx.author)
+        try:
+            item = await self.bot.players.equip_item(player, item_id)
+        except ValueError as exc:
+            await ctx.send(str(exc))
+            return
+        await ctx.send(f"Equipped {item.name}.")
+
+    @commands.hybrid_command(name="unequip", description="Unequip an item.")
+    async def unequip(self, ctx: commands.Context, item_id: int) -> None:
+        player = await self._ensure_player(ctx.author)
+        try:
+            await self.bot.players.unequip_item(player, item_id)
+        except ValueError as exc:
+            await ctx.send(str(exc))
+            return
+        await ctx.send(f"Unequipped item {item_id}.")
@@ -33,6 +33,26 @@ def _load_env_file(path: str = ".env") -> None:
         os.environ.setdefault(key, value)
 
 
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return int(raw)
+    except ValueError as exc:
+        raise RuntimeError(f"{name} must be an integer, got {raw!r}.") from exc
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return float(raw)
+    except ValueError as exc:
+        raise RuntimeError(f"{name} must be a number, got {raw!r}.") from exc
+
+
 @dataclass(slots=True)
 class Settings:
     """Runtime configuration loaded from environment variables."""
@@ -41,6 +61,32 @@ class Settings:
     database_path: str = "rpg.db"
     lurkr_api_base_url: str | None = None
     lurkr_api_token: str | None = None
+    database_read_pool_size: int = 4
+    database_busy_timeout_ms: int = 5000
+    database_synchronous: str = "NORMAL"
+    database_group_commit_ms: float = 0.0
+    player_cache_size: int = 1024
+    player_cache_ttl: float = 60.0
+    lurkr_sync_interval: float = 900.0
+    lurkr_timeout: float = 10.0
+    lurkr_connect_timeout: float = 5.0
+    lurkr_connection_limit: int = 20
+    lurkr_rate_limit: float = 10.0
+    lurkr_max_concurrency: int = 5
+    lurkr_max_retries: int = 3
+    lurkr_bulk_sync_interval: float = 3600.0
+    ledger_flush_size: int = 500
+    ledger_flush_interval: float = 5.0
+    ledger_snapshot_interval: float = 3600.0
+    ledger_retention_days: float = 30.0
+    activity_xp_per_message: int = 15
+    activity_xp_cooldown: float = 60.0
+    activity_flush_interval: float = 30.0
+    matchmaking_party_size: int = 4
+    matchmaking_level_band: int = 10
+    message_burst: int = 5
+    message_window: float = 5.0
+    battle_replay_retention_days: float = 30.0
 
     @classmethod
     def load(cls) -> "Settings":
@@ -56,4 +102,30 @@ def load(cls) -> "Settings":
             database_path=os.getenv("DATABASE_PATH", "rpg.db"),
             lurkr_api_base_url=os.getenv("LURKR_API_BASE_URL"),
             lurkr_api_token=os.getenv("LURKR_API_TOKEN"),
+            database_read_pool_size=_env_int("DATABASE_READ_POOL_SIZE", 4),
+            database_busy_timeout_ms=_env_int("DATABASE_BUSY_TIMEOUT_MS", 5000),
+            database_synchronous=os.getenv("DATABASE_SYNCHRONOUS", "NORMAL").upper(),
+            database_group_commit_ms=_env_float("DATABASE_GROUP_COMMIT_MS", 0.0),
+            player_cache_size=_env_int("PLAYER_CACHE_SIZE", 1024),
+            player_cache_ttl=_env_float("PLAYER_CACHE_TTL", 60.0),
+            lurkr_sync_interval=_env_float("LURKR_SYNC_INTERVAL", 900.0),
+            lurkr_timeout=_env_float("LURKR_TIMEOUT", 10.0),
+            lurkr_connect_timeout=_env_float("LURKR_CONNECT_TIMEOUT", 5.0),
+            lurkr_connection_limit=_env_int("LURKR_CONNECTION_LIMIT", 20),
+            lurkr_rate_limit=_env_float("LURKR_RATE_LIMIT", 10.0),
+            lurkr_max_concurrency=_env_int("LURKR_MAX_CONCURRENCY", 5),
+            lurkr_max_retries=_env_int("LURKR_MAX_RETRIES", 3),
+            lurkr_bulk_sync_interval=_env_float("LURKR_BULK_SYNC_INTERVAL", 3600.0),
+            ledger_flush_size=_env_int("LEDGER_FLUSH_SIZE", 500),
+            ledger_flush_interval=_env_float("LEDGER_FLUSH_INTERVAL", 5.0),
+            ledger_snapshot_interval=_env_float("LEDGER_SNAPSHOT_INTERVAL", 3600.0),
+            ledger_retention_days=_env_float("LEDGER_RETENTION_DAYS", 30.0),
+            activity_xp_per_message=_env_int("ACTIVITY_XP_PER_MESSAGE", 15),
+            activity_xp_cooldown=_env_float("ACTIVITY_XP_COOLDOWN", 60.0),
+            activity_flush_interval=_env_float("ACTIVITY_FLUSH_INTERVAL", 30.0),
+            matchmaking_party_size=_env_int("MATCHMAKING_PARTY_SIZE", 4),
+            matchmaking_level_band=_env_int("MATCHMAKING_LEVEL_BAND", 10),
+            message_burst=_env_int("MESSAGE_BURST", 5),
+            message_window=_env_float("MESSAGE_WINDOW", 5.0),
+            battle_replay_retention_days=_env_float("BATTLE_REPLAY_RETENTION_DAYS", 30.0),
         )
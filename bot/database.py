@@ -1,12 +1,18 @@
 """Database layer for the Discord RPG bot."""
 from __future__ import annotations
 
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+import itertools
 import json
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Sequence, TypeVar
 
 import aiosqlite
 
+from .models import DEFAULT_EQUIP_LIMIT, EQUIP_LIMITS
+
 
 SCHEMA = (
     """
@@ -19,6 +25,7 @@
         class_id INTEGER,
         coins INTEGER NOT NULL DEFAULT 0,
         experience INTEGER NOT NULL DEFAULT 0,
+        last_synced_at REAL,
         FOREIGN KEY(class_id) REFERENCES classes(id)
     );
 
@@ -74,6 +81,7 @@
         description TEXT,
         item_type TEXT NOT NULL,
         price INTEGER NOT NULL DEFAULT 0,
+        currency_id INTEGER NOT NULL DEFAULT 0,
         modifiers TEXT NOT NULL DEFAULT '{}'
     );
 
@@ -87,6 +95,8 @@
         FOREIGN KEY(item_id) REFERENCES items(id) ON DELETE CASCADE
     );
 
+    CREATE INDEX IF NOT EXISTS idx_inventory_equipped ON inventory(user_id) WHERE equipped = 1;
+
     CREATE TABLE IF NOT EXISTS quests (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         name TEXT UNIQUE NOT NULL,
@@ -112,7 +122,8 @@
         level INTEGER NOT NULL DEFAULT 1,
         stats TEXT NOT NULL DEFAULT '{}',
         rewards TEXT NOT NULL DEFAULT '{}',
-        is_boss INTEGER NOT NULL DEFAULT 0
+        is_boss INTEGER NOT NULL DEFAULT 0,
+        version INTEGER NOT NULL DEFAULT 1
     );
 
     CREATE TABLE IF NOT EXISTS parties (
@@ -146,24 +157,229 @@
         FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE,
         FOREIGN KEY(currency_id) REFERENCES currencies(id) ON DELETE CASCADE
     );
+
+    CREATE TABLE IF NOT EXISTS user_stats (
+        user_id INTEGER PRIMARY KEY,
+        lurkr_level INTEGER NOT NULL,
+        constitution REAL NOT NULL,
+        agility REAL NOT NULL,
+        defense REAL NOT NULL,
+        endurance REAL NOT NULL,
+        dantian_size REAL NOT NULL,
+        strength REAL NOT NULL,
+        spirit REAL NOT NULL,
+        combat_power REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_user_stats_combat_power ON user_stats(combat_power DESC);
+
+    CREATE TABLE IF NOT EXISTS ledger (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        currency_id INTEGER NOT NULL DEFAULT 0,
+        amount INTEGER NOT NULL,
+        reason TEXT NOT NULL,
+        created_at REAL NOT NULL
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_ledger_user ON ledger(user_id, currency_id, id);
+
+    CREATE TABLE IF NOT EXISTS ledger_snapshots (
+        user_id INTEGER NOT NULL,
+        currency_id INTEGER NOT NULL,
+        balance INTEGER NOT NULL,
+        ledger_id INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (user_id, currency_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS battle_replays (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        enemy_id INTEGER NOT NULL,
+        enemy_version INTEGER NOT NULL,
+        seed INTEGER NOT NULL,
+        success INTEGER NOT NULL,
+        turns INTEGER NOT NULL,
+        party BLOB NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_battle_replays_created ON battle_replays(created_at);
     """
 )
 
 
+T = TypeVar("T")
+
+# Columns added after the initial release. ``CREATE TABLE IF NOT EXISTS`` does
+# not touch existing tables, so ``connect`` adds any that are missing.
+COLUMN_MIGRATIONS: tuple[tuple[str, str, str], ...] = (
+    ("users", "last_synced_at", "REAL"),
+    ("items", "currency_id", "INTEGER NOT NULL DEFAULT 0"),
+    ("enemies", "version", "INTEGER NOT NULL DEFAULT 1"),
+)
+
+# Bumped, through ``PRAGMA user_version``, for one-time data migrations.
+DATA_VERSION = 1
+
+# Unique indexes added after the initial release as ``(name, table, column)``.
+# Existing databases may already hold duplicates, so ``connect`` keeps the
+# oldest row for each value before creating the index.
+UNIQUE_INDEX_MIGRATIONS: tuple[tuple[str, str, str], ...] = (
+    ("idx_party_members_user", "party_members", "user_id"),
+)
+
+SYNCHRONOUS_LEVELS = frozenset({"OFF", "NORMAL", "FULL", "EXTRA"})
+
+
 class Database:
-    """Simple asynchronous SQLite wrapper used by services."""
+    """Simple asynchronous SQLite wrapper used by services.
+
+    When ``read_pool_size`` is greater than zero the database runs in WAL mode
+    with one dedicated writer connection and a bounded pool of read-only
+    connections that serve ``fetch_one`` and ``fetch_all``. Reads then run in
+    parallel with writes instead of queueing behind them on a single
+    connection thread. In-memory databases always use a single connection.
+
+    Writes are serialized on the writer. ``transaction()`` groups several
+    statements into one commit, and a non-zero ``group_commit_window`` merges
+    standalone ``execute`` calls from concurrent commands into a single commit
+    issued at most that many seconds after the first pending write.
+    """
 
-    def __init__(self, path: str):
+    def __init__(
+        self,
+        path: str,
+        *,
+        read_pool_size: int = 0,
+        busy_timeout_ms: int = 5000,
+        synchronous: str = "NORMAL",
+        group_commit_window: float = 0.0,
+    ):
+        synchronous = synchronous.upper()
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(
+                f"synchronous must be one of {', '.join(sorted(SYNCHRONOUS_LEVELS))}"
+            )
+        if read_pool_size < 0:
+            raise ValueError("read_pool_size cannot be negative")
+        if group_commit_window < 0:
+            raise ValueError("group_commit_window cannot be negative")
         self.path = Path(path)
+        self.read_pool_size = read_pool_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.synchronous = synchronous
         self._conn: aiosqlite.Connection | None = None
+        self._readers: list[aiosqlite.Connection] = []
+        self._idle_readers: asyncio.Queue[aiosqlite.Connection] | None = None
+        self.group_commit_window = group_commit_window
+        self._write_lock = asyncio.Lock()
+        self._in_transaction: ContextVar[bool] = ContextVar(f"db_transaction_{id(self)}", default=False)
+        self._after_commit: ContextVar[list[Callable[[], None]] | None] = ContextVar(
+            f"db_after_commit_{id(self)}", default=None
+        )
+        self._savepoint_ids = itertools.count()
+        self._pending_commit: asyncio.Future[None] | None = None
+        self._commit_task: asyncio.Task[None] | None = None
+
+    @property
+    def pooled(self) -> bool:
+        return self.read_pool_size > 0 and str(self.path) != ":memory:"
+
+    async def _open(self, target: str | Path, *, uri: bool = False) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(target, uri=uri)
+        conn.row_factory = aiosqlite.Row
+        await conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        await conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        return conn
 
     async def connect(self) -> None:
-        self._conn = await aiosqlite.connect(self.path)
-        self._conn.row_factory = aiosqlite.Row
+        self._conn = await self._open(self.path)
+        if self.pooled:
+            await self._conn.execute("PRAGMA journal_mode = WAL")
         await self._conn.executescript(SCHEMA)
+        await self._migrate()
         await self._conn.commit()
+        if not self.pooled:
+            return
+        reader_uri = f"{self.path.resolve().as_uri()}?mode=ro"
+        self._idle_readers = asyncio.Queue(maxsize=self.read_pool_size)
+        for _ in range(self.read_pool_size):
+            reader = await self._open(reader_uri, uri=True)
+            await reader.execute("PRAGMA query_only = ON")
+            self._readers.append(reader)
+            self._idle_readers.put_nowait(reader)
+
+    async def _migrate(self) -> None:
+        for table, column, definition in COLUMN_MIGRATIONS:
+            cursor = await self.connection.execute(f"PRAGMA table_info({table})")
+            existing = {row["name"] for row in await cursor.fetchall()}
+            await cursor.close()
+            if column not in existing:
+                await self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        for name, table, column in UNIQUE_INDEX_MIGRATIONS:
+            cursor = await self.connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)
+            )
+            exists = await cursor.fetchone()
+            await cursor.close()
+            if exists:
+                continue
+            await self.connection.execute(
+                f"DELETE FROM {table} WHERE rowid NOT IN (SELECT MIN(rowid) FROM {table} GROUP BY {column})"
+            )
+            await self.connection.execute(f"CREATE UNIQUE INDEX {name} ON {table}({column})")
+        cursor = await self.connection.execute("PRAGMA user_version")
+        (version,) = await cursor.fetchone()
+        await cursor.close()
+        if version < 1:
+            await self._equip_legacy_inventory()
+        if version < DATA_VERSION:
+            await self.connection.execute(f"PRAGMA user_version = {DATA_VERSION}")
+
+    async def _equip_legacy_inventory(self) -> None:
+        # Before equipment slots every owned item counted towards stats, and
+        # nothing ever set ``equipped``. Equip what players own, oldest item
+        # first up to the slot limit of each type, for everyone who has not
+        # equipped anything yet. Their stored stats are then dropped so the
+        # startup backfill rebuilds them from the equipped items.
+        limits = " ".join("WHEN ? THEN ?" for _ in EQUIP_LIMITS)
+        params = [value for kind, limit in EQUIP_LIMITS.items() for value in (kind, limit)]
+        await self.connection.execute(
+            f"""
+            UPDATE inventory SET equipped = 1 WHERE rowid IN (
+                SELECT owned.rowid FROM (
+                    SELECT inv.rowid,
+                           lower(i.item_type) AS kind,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY inv.user_id, lower(i.item_type) ORDER BY inv.item_id
+                           ) AS slot
+                    FROM inventory inv
+                    JOIN items i ON i.id = inv.item_id
+                    WHERE inv.quantity > 0
+                      AND inv.user_id NOT IN (SELECT user_id FROM inventory WHERE equipped = 1)
+                ) AS owned
+                WHERE owned.slot <= CASE owned.kind {limits} ELSE ? END
+            )
+            """,
+            (*params, DEFAULT_EQUIP_LIMIT),
+        )
+        await self.connection.execute(
+            "DELETE FROM user_stats WHERE user_id IN (SELECT user_id FROM inventory WHERE equipped = 1)"
+        )
 
     async def close(self) -> None:
+        if self._commit_task is not None:
+            self._commit_task.cancel()
+            self._commit_task = None
+        if self._conn is not None:
+            async with self._write_lock:
+                await self._commit_pending()
+        readers, self._readers = self._readers, []
+        self._idle_readers = None
+        for reader in readers:
+            await reader.close()
         if self._conn is not None:
             await self._conn.close()
             self._conn = None
@@ -174,21 +390,154 @@ def connection(self) -> aiosqlite.Connection:
             raise RuntimeError("Database connection accessed before initialization")
         return self._conn
 
+    @asynccontextmanager
+    async def _reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        if self._idle_readers is None or self._in_transaction.get():
+            # Inside a transaction reads must see the scope's uncommitted writes.
+            yield self.connection
+            return
+        reader = await self._idle_readers.get()
+        try:
+            yield reader
+        finally:
+            self._idle_readers.put_nowait(reader)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        """Run the enclosed statements on the writer and commit them once.
+
+        Nested scopes run as savepoints of the outermost one, so an exception
+        rolls back every statement issued inside the scope that raised it and
+        callers can handle the error without discarding the outer scope.
+        """
+        if self._in_transaction.get():
+            async with self._savepoint():
+                yield
+            return
+        callbacks: list[Callable[[], None]] = []
+        async with self._write_lock:
+            await self._commit_pending()
+            token = self._in_transaction.set(True)
+            callbacks_token = self._after_commit.set(callbacks)
+            try:
+                await self.connection.execute("BEGIN IMMEDIATE")
+                yield
+            except BaseException:
+                await self.connection.rollback()
+                raise
+            else:
+                await self.connection.commit()
+            finally:
+                self._after_commit.reset(callbacks_token)
+                self._in_transaction.reset(token)
+        for callback in callbacks:
+            callback()
+
+    @asynccontextmanager
+    async def _savepoint(self) -> AsyncIterator[None]:
+        name = f"sp_{next(self._savepoint_ids)}"
+        parent = self._after_commit.get()
+        callbacks: list[Callable[[], None]] = []
+        token = self._after_commit.set(callbacks)
+        await self.connection.execute(f"SAVEPOINT {name}")
+        try:
+            yield
+        except BaseException:
+            await self.connection.execute(f"ROLLBACK TO {name}")
+            await self.connection.execute(f"RELEASE {name}")
+            raise
+        else:
+            await self.connection.execute(f"RELEASE {name}")
+            if parent is not None:
+                parent.extend(callbacks)
+        finally:
+            self._after_commit.reset(token)
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """Run ``callback`` once the current transaction commits.
+
+        Outside a transaction the callback runs immediately. If the transaction
+        rolls back the callback is dropped.
+        """
+        callbacks = self._after_commit.get()
+        if callbacks is None:
+            callback()
+        else:
+            callbacks.append(callback)
+
     async def execute(self, query: str, *params: Any) -> aiosqlite.Cursor:
-        cursor = await self.connection.execute(query, params)
-        await self.connection.commit()
+        cursor, _ = await self._write(self._run(query, params, fetch=False))
         return cursor
 
-    async def fetch_one(self, query: str, *params: Any) -> dict[str, Any] | None:
+    async def execute_fetch_one(self, query: str, *params: Any) -> dict[str, Any] | None:
+        """Run a write with a ``RETURNING`` clause and return its first row."""
+        _, rows = await self._write(self._run(query, params, fetch=True))
+        return dict(rows[0]) if rows else None
+
+    async def execute_fetch_all(self, query: str, *params: Any) -> list[dict[str, Any]]:
+        """Run a write with a ``RETURNING`` clause and return every row."""
+        _, rows = await self._write(self._run(query, params, fetch=True))
+        return [dict(row) for row in rows]
+
+    async def executemany(self, query: str, params: Iterable[Sequence[Any]]) -> None:
+        """Run one statement for every parameter tuple and commit them together."""
+        await self._write(self.connection.executemany(query, params))
+
+    async def _write(self, operation: Awaitable[T]) -> T:
+        if self._in_transaction.get():
+            return await operation
+        async with self._write_lock:
+            result = await operation
+            if not self.group_commit_window:
+                await self.connection.commit()
+                return result
+            waiter = self._schedule_group_commit()
+        await asyncio.shield(waiter)
+        return result
+
+    async def _run(
+        self, query: str, params: tuple[Any, ...], *, fetch: bool
+    ) -> tuple[aiosqlite.Cursor, list[aiosqlite.Row]]:
         cursor = await self.connection.execute(query, params)
-        row = await cursor.fetchone()
-        await cursor.close()
+        # RETURNING rows have to be consumed before the statement is committed.
+        rows = list(await cursor.fetchall()) if fetch else []
+        return cursor, rows
+
+    def _schedule_group_commit(self) -> asyncio.Future[None]:
+        if self._pending_commit is None:
+            self._pending_commit = asyncio.get_running_loop().create_future()
+            self._commit_task = asyncio.create_task(self._flush_group_commit())
+        return self._pending_commit
+
+    async def _flush_group_commit(self) -> None:
+        await asyncio.sleep(self.group_commit_window)
+        async with self._write_lock:
+            await self._commit_pending()
+
+    async def _commit_pending(self) -> None:
+        """Commit writes waiting on the group commit; the write lock must be held."""
+        waiter, self._pending_commit = self._pending_commit, None
+        if waiter is None:
+            return
+        try:
+            await self.connection.commit()
+        except Exception as exc:  # noqa: BLE001
+            waiter.set_exception(exc)
+        else:
+            waiter.set_result(None)
+
+    async def fetch_one(self, query: str, *params: Any) -> dict[str, Any] | None:
+        async with self._reader() as conn:
+            cursor = await conn.execute(query, params)
+            row = await cursor.fetchone()
+            await cursor.close()
         return dict(row) if row else None
 
     async def fetch_all(self, query: str, *params: Any) -> list[dict[str, Any]]:
-        cursor = await self.connection.execute(query, params)
-        rows = await cursor.fetchall()
-        await cursor.close()
+        async with self._reader() as conn:
+            cursor = await conn.execute(query, params)
+            rows = await cursor.fetchall()
+            await cursor.close()
         return [dict(row) for row in rows]
 
     @staticmethod
@@ -0,0 +1,39 @@
+"""Activity level curve mapping accumulated XP to a level."""
+from __future__ import annotations
+
+from bisect import bisect_right
+
+MAX_LEVEL = 200
+
+
+def xp_to_next(level: int) -> int:
+    """XP needed to go from ``level`` to ``level + 1``."""
+    return 5 * level * level + 50 * level + 100
+
+
+def build_level_curve(max_level: int = MAX_LEVEL) -> tuple[int, ...]:
+    """Cumulative XP thresholds; entry ``n`` is the XP at which level ``n`` starts."""
+    thresholds = [0]
+    for level in range(max_level):
+        thresholds.append(thresholds[-1] + xp_to_next(level))
+    return tuple(thresholds)
+
+
+# Precomputed once so a lookup is a binary search instead of a loop over levels.
+LEVEL_CURVE = build_level_curve()
+
+
+def level_for_xp(xp: int) -> int:
+    return bisect_right(LEVEL_CURVE, max(0, xp)) - 1
+
+
+def level_progress(xp: int) -> tuple[int, int, int]:
+    """Return ``(level, xp into the level, xp the level requires)``.
+
+    At the maximum level the last two values are both zero.
+    """
+    level = level_for_xp(xp)
+    if level >= len(LEVEL_CURVE) - 1:
+        return level, 0, 0
+    start = LEVEL_CURVE[level]
+    return level, xp - start, LEVEL_CURVE[level + 1] - start
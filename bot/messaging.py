@@ -0,0 +1,215 @@
+"""Outbound Discord messages: coalesced replies and per-channel send queues."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Sequence, TypeVar
+
+import discord
+from discord.ext import commands
+
+MESSAGE_LIMIT = 2000
+EMBEDS_PER_MESSAGE = 10
+EMBED_TOTAL_LIMIT = 6000
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class OutboundMessage:
+    content: str = ""
+    embeds: list[discord.Embed] = field(default_factory=list)
+
+
+class ResponseBuilder:
+    """Collect the lines and embeds of one reply, then send them together.
+
+    ``build`` packs them, in order, into as few messages as Discord accepts:
+    lines are joined up to ``MESSAGE_LIMIT`` characters, and embeds ride along
+    until a message holds ``EMBEDS_PER_MESSAGE`` embeds or ``EMBED_TOTAL_LIMIT``
+    embed characters. Discord shows a message's text above its embeds, so a
+    line written after an embed starts a new message.
+    """
+
+    def __init__(self) -> None:
+        self._parts: list[str | discord.Embed] = []
+
+    def __bool__(self) -> bool:
+        return bool(self._parts)
+
+    def line(self, text: str) -> ResponseBuilder:
+        self._parts.append(text)
+        return self
+
+    def lines(self, texts: Iterable[str]) -> ResponseBuilder:
+        self._parts.extend(texts)
+        return self
+
+    def embed(self, embed: discord.Embed) -> ResponseBuilder:
+        self._parts.append(embed)
+        return self
+
+    def build(self) -> list[OutboundMessage]:
+        messages: list[OutboundMessage] = []
+        current = OutboundMessage()
+        embed_chars = 0
+
+        def flush() -> None:
+            nonlocal current, embed_chars
+            if current.content or current.embeds:
+                messages.append(current)
+            current = OutboundMessage()
+            embed_chars = 0
+
+        for part in self._parts:
+            if isinstance(part, discord.Embed):
+                size = len(part)
+                if len(current.embeds) >= EMBEDS_PER_MESSAGE or embed_chars + size > EMBED_TOTAL_LIMIT:
+                    flush()
+                current.embeds.append(part)
+                embed_chars += size
+                continue
+            if current.embeds:
+                flush()
+            # Lines longer than a whole message are cut into message-sized pieces.
+            for start in range(0, max(1, len(part)), MESSAGE_LIMIT):
+                piece = part[start : start + MESSAGE_LIMIT]
+                if not current.content:
+                    # Blank lines only separate text; they never open a message.
+                    if piece.strip():
+                        current.content = piece
+                elif len(current.content) + 1 + len(piece) <= MESSAGE_LIMIT:
+                    current.content += "\n" + piece
+                else:
+                    flush()
+                    if piece.strip():
+                        current.content = piece
+        flush()
+        return messages
+
+    async def send(self, ctx: commands.Context, outbox: ChannelOutbox) -> None:
+        """Send the reply for ``ctx``.
+
+        Slash invocations answer their interaction directly, since interaction
+        responses and follow-ups do not count against the channel's limits.
+        Prefix commands post through ``outbox`` as one uninterrupted batch.
+        """
+        messages = self.build()
+        if ctx.interaction is None:
+            await outbox.send_many(ctx.channel, messages)
+            return
+        for message in messages:
+            await ctx.send(content=message.content or None, embeds=message.embeds)
+
+
+@dataclass(slots=True)
+class _ChannelQueue:
+    # When each of the channel's last ``burst`` messages was sent.
+    sent: deque[float] = field(default_factory=deque)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    waiting: int = 0
+    last_used: float = 0.0
+
+
+class ChannelOutbox:
+    """Send messages one channel at a time within Discord's rate limits.
+
+    Each channel may receive at most ``burst`` messages in any ``window``
+    seconds, matching Discord's per-channel limit of five messages per five
+    seconds by default; a message that would exceed it waits until the oldest
+    send in the window expires. Sends to one channel queue on a FIFO lock, so
+    a busy channel waits its turn instead of collecting 429s, and the messages
+    of one ``send_many`` call are never interleaved with other replies. Queues
+    idle for ``idle_timeout`` seconds are dropped.
+    """
+
+    def __init__(
+        self,
+        *,
+        burst: int = 5,
+        window: float = 5.0,
+        idle_timeout: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        if window <= 0:
+            raise ValueError("window must be positive")
+        self.burst = burst
+        self.window = window
+        self.idle_timeout = idle_timeout
+        self._clock = clock
+        self._queues: dict[int, _ChannelQueue] = {}
+
+    def __len__(self) -> int:
+        return len(self._queues)
+
+    async def send(self, channel: discord.abc.Messageable, message: OutboundMessage) -> discord.Message:
+        return (await self.send_many(channel, [message]))[0]
+
+    async def send_many(
+        self, channel: discord.abc.Messageable, messages: Sequence[OutboundMessage]
+    ) -> list[discord.Message]:
+        """Send ``messages`` in order, holding the channel's queue until the last one is out."""
+        if not messages:
+            return []
+        async with self._hold(channel) as queue:
+            sent = []
+            for message in messages:
+                await self._wait_for_slot(queue)
+                sent.append(await channel.send(content=message.content or None, embeds=message.embeds))
+                queue.sent.append(self._clock())
+            return sent
+
+    async def call(self, channel: discord.abc.Messageable, send: Callable[[], Awaitable[T]]) -> T:
+        """Run ``send``, a coroutine function posting one message to ``channel``, in the channel's queue."""
+        async with self._hold(channel) as queue:
+            await self._wait_for_slot(queue)
+            result = await send()
+            queue.sent.append(self._clock())
+            return result
+
+    @asynccontextmanager
+    async def _hold(self, channel: discord.abc.Messageable) -> AsyncIterator[_ChannelQueue]:
+        key = getattr(channel, "id", id(channel))
+        queue = self._queues.get(key)
+        if queue is None:
+            self._prune()
+            queue = self._queues[key] = _ChannelQueue()
+        queue.waiting += 1
+        try:
+            async with queue.lock:
+                yield queue
+        finally:
+            queue.waiting -= 1
+            queue.last_used = self._clock()
+
+    async def _wait_for_slot(self, queue: _ChannelQueue) -> None:
+        while len(queue.sent) >= self.burst:
+            delay = queue.sent[0] + self.window - self._clock()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            queue.sent.popleft()
+
+    def _prune(self) -> None:
+        cutoff = self._clock() - self.idle_timeout
+        for key in [key for key, queue in self._queues.items() if not queue.waiting and queue.last_used < cutoff]:
+            del self._queues[key]
+
+
+class RPGContext(commands.Context):
+    """Command context whose prefix replies go through the bot's ``ChannelOutbox``.
+
+    ``RPGBot.get_context`` creates these, so every ``ctx.send`` in the cogs
+    shares its channel's queue. Slash invocations reply to their interaction
+    as usual.
+    """
+
+    async def send(self, content: str | None = None, **kwargs: Any) -> discord.Message:
+        send = super().send
+        if self.interaction is not None:
+            return await send(content, **kwargs)
+        return await self.bot.outbox.call(self.channel, lambda: send(content, **kwargs))
@@ -4,6 +4,27 @@
 from dataclasses import dataclass, field
 from typing import Any
 
+from .stats import (
+    CompiledModifiers,
+    StatBlock,
+    combine_all,
+    compile_modifiers,
+    compile_multipliers,
+    scale_modifiers,
+)
+
+# Per-level enemy stats, in canonical order, used when a payload omits a stat.
+ENEMY_STAT_SCALING = (12.0, 4.0, 5.0, 5.0, 3.0, 8.0, 6.0)
+
+# How many items of each ``item_type`` a player may equip at once. Types not
+# listed allow ``DEFAULT_EQUIP_LIMIT``.
+EQUIP_LIMITS: dict[str, int] = {
+    "accessory": 2,
+    "ring": 2,
+    "consumable": 0,
+}
+DEFAULT_EQUIP_LIMIT = 1
+
 
 @dataclass(slots=True)
 class RPGClass:
@@ -17,6 +38,18 @@ class RPGClass:
     dantian_multiplier: float
     strength_multiplier: float
     spirit_multiplier: float
+    compiled: CompiledModifiers = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.compiled = compile_multipliers(
+            self.constitution_multiplier,
+            self.agility_multiplier,
+            self.defense_multiplier,
+            self.endurance_multiplier,
+            self.dantian_multiplier,
+            self.strength_multiplier,
+            self.spirit_multiplier,
+        )
 
 
 @dataclass(slots=True)
@@ -25,6 +58,10 @@ class Trait:
     name: str
     description: str
     modifiers: dict[str, float]
+    compiled: CompiledModifiers = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.compiled = compile_modifiers(self.modifiers)
 
 
 @dataclass(slots=True)
@@ -35,6 +72,19 @@ class Item:
     item_type: str
     price: int
     modifiers: dict[str, float]
+    # 0 prices the item in coins; otherwise a ``currencies`` row.
+    currency_id: int = 0
+    compiled: CompiledModifiers = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.compiled = compile_modifiers(self.modifiers)
+
+
+@dataclass(slots=True)
+class InventoryEntry:
+    item: Item
+    quantity: int
+    equipped: bool
 
 
 @dataclass(slots=True)
@@ -84,6 +134,16 @@ class Enemy:
     stats: dict[str, Any]
     rewards: dict[str, Any]
     is_boss: bool = False
+    # Bumped whenever the enemy's level or stats change, so battle replays
+    # can tell whether they still face the same enemy.
+    version: int = 1
+    stat_block: StatBlock = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.stat_block = StatBlock.from_mapping(
+            self.stats,
+            defaults=[self.level * scale for scale in ENEMY_STAT_SCALING],
+        )
 
 
 @dataclass(slots=True)
@@ -93,76 +153,38 @@ class Player:
     lurkr_level: int
     coins: int
     experience: int
+    last_synced_at: float | None = None
     rpg_class: RPGClass | None = None
     traits: list[Trait] = field(default_factory=list)
+    # Equipped items only; the rest of the inventory does not affect stats.
     items: list[Item] = field(default_factory=list)
     skills: list[Skill] = field(default_factory=list)
-
-    def calculate_stats(self) -> dict[str, float]:
+    # Balances of non-coin currencies keyed by currency ID.
+    wallet: dict[int, int] = field(default_factory=dict)
+
+    _loadout_key: tuple[Any, ...] | None = field(default=None, init=False, repr=False, compare=False)
+    _multipliers: CompiledModifiers | None = field(default=None, init=False, repr=False, compare=False)
+
+    def loadout_key(self) -> tuple[Any, ...]:
+        """Fingerprint of everything that feeds the stat multipliers."""
+        return (
+            self.rpg_class.id if self.rpg_class else None,
+            tuple(trait.id for trait in self.traits),
+            tuple(item.id for item in self.items),
+        )
+
+    def stat_multipliers(self) -> CompiledModifiers:
+        """Combined class, trait and item multipliers, cached per loadout."""
+        key = self.loadout_key()
+        if self._multipliers is None or self._loadout_key != key:
+            parts = [trait.compiled for trait in self.traits]
+            parts.extend(item.compiled for item in self.items)
+            if self.rpg_class:
+                parts.insert(0, self.rpg_class.compiled)
+            self._multipliers = combine_all(parts)
+            self._loadout_key = key
+        return self._multipliers
+
+    def calculate_stats(self) -> StatBlock:
         """Compute derived stats using Lurkr level, class multipliers and traits."""
-        base_stat = max(1, self.lurkr_level)
-        canonical_map = {
-            "constitution": "constitution",
-            "hp": "constitution",
-            "agility": "agility",
-            "defense": "defense",
-            "endurance": "endurance",
-            "stamina": "endurance",
-            "attack": "strength",
-            "power": "strength",
-            "strength": "strength",
-            "dantian_size": "dantian_size",
-            "qi": "dantian_size",
-            "dantian": "dantian_size",
-            "spirit": "spirit",
-            "will": "spirit",
-            "magic": "spirit",
-            "mana": "spirit",
-            "intelligence": "spirit",
-        }
-        multipliers: dict[str, float] = {
-            "constitution": 1.0,
-            "agility": 1.0,
-            "defense": 1.0,
-            "endurance": 1.0,
-            "dantian_size": 1.0,
-            "strength": 1.0,
-            "spirit": 1.0,
-        }
-
-        def apply_multiplier(key: str, value: float) -> None:
-            canonical = canonical_map.get(key, key)
-            multipliers[canonical] = multipliers.get(canonical, 1.0) * value
-
-        if self.rpg_class:
-            apply_multiplier("constitution", self.rpg_class.constitution_multiplier)
-            apply_multiplier("agility", self.rpg_class.agility_multiplier)
-            apply_multiplier("defense", self.rpg_class.defense_multiplier)
-            apply_multiplier("endurance", self.rpg_class.endurance_multiplier)
-            apply_multiplier("dantian_size", self.rpg_class.dantian_multiplier)
-            apply_multiplier("strength", self.rpg_class.strength_multiplier)
-            apply_multiplier("spirit", self.rpg_class.spirit_multiplier)
-
-        for trait in self.traits:
-            for key, value in trait.modifiers.items():
-                apply_multiplier(key, value)
-        for item in self.items:
-            for key, value in item.modifiers.items():
-                apply_multiplier(key, value)
-
-        ordered_stats = {
-            key: base_stat * multipliers.get(key, 1.0)
-            for key in (
-                "constitution",
-                "agility",
-                "defense",
-                "endurance",
-                "dantian_size",
-                "strength",
-                "spirit",
-            )
-        }
-        for key, mult in multipliers.items():
-            if key not in ordered_stats:
-                ordered_stats[key] = base_stat * mult
-        return ordered_stats
+        return scale_modifiers(self.stat_multipliers(), max(1, self.lurkr_level))
@@ -0,0 +1,79 @@
+"""Map database rows onto domain models.
+
+Rows are plain ``dict``s as returned by ``Database.fetch_*`` or decoded from
+the JSON aggregates in ``PLAYER_SELECT``, so modifier and stat payloads may
+arrive either serialized or already decoded.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from .database import Database
+from .models import Enemy, Item, RPGClass, Skill, Trait
+
+
+def _payload(raw: str | dict[str, Any] | None) -> dict[str, Any]:
+    if isinstance(raw, dict):
+        return raw
+    return Database.deserialize_payload(raw)
+
+
+def class_from_row(row: dict[str, Any]) -> RPGClass:
+    return RPGClass(
+        id=row["id"],
+        name=row["name"],
+        description=row.get("description", ""),
+        constitution_multiplier=row.get("constitution_multiplier", 1.0),
+        agility_multiplier=row.get("agility_multiplier", 1.0),
+        defense_multiplier=row.get("defense_multiplier", 1.0),
+        endurance_multiplier=row.get("endurance_multiplier", 1.0),
+        dantian_multiplier=row.get("dantian_multiplier", 1.0),
+        strength_multiplier=row.get("strength_multiplier", 1.0),
+        spirit_multiplier=row.get("spirit_multiplier", 1.0),
+    )
+
+
+def skill_from_row(row: dict[str, Any]) -> Skill:
+    return Skill(
+        id=row["id"],
+        name=row["name"],
+        description=row.get("description", ""),
+        grade=row.get("grade", "Tier 1"),
+        skill_type=row.get("skill_type", "physical"),
+        cost=row.get("cost", 0),
+        damage_multiplier=row.get("damage_multiplier", 1.0),
+    )
+
+
+def trait_from_row(row: dict[str, Any]) -> Trait:
+    return Trait(
+        id=row["id"],
+        name=row["name"],
+        description=row.get("description", ""),
+        modifiers=_payload(row.get("modifiers")),
+    )
+
+
+def item_from_row(row: dict[str, Any]) -> Item:
+    return Item(
+        id=row["id"],
+        name=row["name"],
+        description=row.get("description", ""),
+        item_type=row["item_type"],
+        price=row["price"],
+        modifiers=_payload(row.get("modifiers")),
+        currency_id=row.get("currency_id") or 0,
+    )
+
+
+def enemy_from_row(row: dict[str, Any]) -> Enemy:
+    return Enemy(
+        id=row["id"],
+        name=row["name"],
+        description=row.get("description", ""),
+        level=row["level"],
+        stats=_payload(row.get("stats")),
+        rewards=_payload(row.get("rewards")),
+        is_boss=bool(row.get("is_boss")),
+        version=row.get("version", 1),
+    )
@@ -0,0 +1,144 @@
+"""Chat activity XP, buffered in memory and written in batches."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Callable
+
+from ..database import Database
+from .players import PlayerService
+
+log = logging.getLogger(__name__)
+
+_BATCH_SIZE = 500
+
+
+class ActivityService:
+    """Award XP for chat messages without a database write per message.
+
+    Each member earns ``xp_per_message`` at most once per ``cooldown`` seconds.
+    Awards accumulate per Discord user in memory and are written every
+    ``flush_interval`` seconds with one batched upsert on ``users.experience``,
+    so a crash loses at most one interval of XP. ``close`` flushes what is left.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        players: PlayerService,
+        *,
+        xp_per_message: int = 15,
+        cooldown: float = 60.0,
+        flush_interval: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if flush_interval <= 0:
+            raise ValueError("flush_interval must be positive")
+        self.db = db
+        self.players = players
+        self.xp_per_message = xp_per_message
+        self.cooldown = cooldown
+        self.flush_interval = flush_interval
+        self._clock = clock
+        self._pending: dict[int, int] = {}
+        self._last_award: dict[int, float] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.xp_per_message > 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def start(self) -> None:
+        if self.enabled:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def record_message(self, discord_id: int) -> bool:
+        """Buffer XP for a message; returns ``False`` while on cooldown."""
+        if not self.enabled:
+            return False
+        now = self._clock()
+        last = self._last_award.get(discord_id)
+        if last is not None and now - last < self.cooldown:
+            return False
+        self._last_award[discord_id] = now
+        self._pending[discord_id] = self._pending.get(discord_id, 0) + self.xp_per_message
+        return True
+
+    def pending_xp(self, discord_id: int) -> int:
+        """XP awarded to a member that has not been written yet."""
+        return self._pending.get(discord_id, 0)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:  # noqa: BLE001
+                log.exception("Failed to flush activity XP")
+
+    async def flush(self) -> int:
+        """Write buffered XP; returns how many members were updated."""
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            self._prune_cooldowns()
+            if not pending:
+                return 0
+            awards = list(pending.items())
+            try:
+                rows = []
+                created: list[int] = []
+                async with self.db.transaction():
+                    for start in range(0, len(awards), _BATCH_SIZE):
+                        chunk = awards[start : start + _BATCH_SIZE]
+                        placeholders = ", ".join(["?"] * len(chunk))
+                        known = await self.db.fetch_all(
+                            f"SELECT discord_id FROM users WHERE discord_id IN ({placeholders})",
+                            *(discord_id for discord_id, _ in chunk),
+                        )
+                        known_ids = {row["discord_id"] for row in known}
+                        chunk_rows = await self.db.execute_fetch_all(
+                            f"""
+                            INSERT INTO users (discord_id, experience)
+                            VALUES {", ".join(["(?, ?)"] * len(chunk))}
+                            ON CONFLICT(discord_id) DO UPDATE SET experience = experience + excluded.experience
+                            RETURNING id, discord_id, experience
+                            """,
+                            *(value for award in chunk for value in award),
+                        )
+                        created += [row["id"] for row in chunk_rows if row["discord_id"] not in known_ids]
+                        rows += chunk_rows
+            except Exception:
+                # Put the awards back so the next flush retries them.
+                for discord_id, xp in pending.items():
+                    self._pending[discord_id] = self._pending.get(discord_id, 0) + xp
+                raise
+        for row in rows:
+            cached = self.players.cache.peek(row["discord_id"])
+            if cached is not None:
+                cached.experience = row["experience"]
+        # Chatters who never used a command were just created; give them
+        # stored stats so they show up on the leaderboard.
+        if created:
+            await self.players.rebuild_stats(created)
+        return len(rows)
+
+    def _prune_cooldowns(self) -> None:
+        cutoff = self._clock() - self.cooldown
+        self._last_award = {
+            discord_id: awarded_at for discord_id, awarded_at in self._last_award.items() if awarded_at > cutoff
+        }
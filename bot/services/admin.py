@@ -4,12 +4,17 @@
 from typing import Any
 
 from ..database import Database
+from .wallet import check_rewards
 
 
 class AdminService:
     def __init__(self, db: Database):
         self.db = db
 
+    async def _check_rewards(self, rewards: dict[str, Any]) -> None:
+        """Reject reward payloads that would fail when they are paid out."""
+        await check_rewards(self.db, rewards)
+
     async def create_class(
         self,
         name: str,
@@ -49,6 +54,40 @@ async def create_class(
         )
         return cursor.lastrowid
 
+    async def update_class_multipliers(
+        self,
+        class_id: int,
+        constitution_multiplier: float,
+        agility_multiplier: float,
+        defense_multiplier: float,
+        endurance_multiplier: float,
+        dantian_multiplier: float,
+        strength_multiplier: float,
+        spirit_multiplier: float,
+    ) -> bool:
+        cursor = await self.db.execute(
+            """
+            UPDATE classes SET
+                constitution_multiplier = ?,
+                agility_multiplier = ?,
+                defense_multiplier = ?,
+                endurance_multiplier = ?,
+                dantian_multiplier = ?,
+                strength_multiplier = ?,
+                spirit_multiplier = ?
+            WHERE id = ?
+            """,
+            constitution_multiplier,
+            agility_multiplier,
+            defense_multiplier,
+            endurance_multiplier,
+            dantian_multiplier,
+            strength_multiplier,
+            spirit_multiplier,
+            class_id,
+        )
+        return cursor.rowcount > 0
+
     async def create_skill(
         self,
         name: str,
@@ -91,6 +130,14 @@ async def create_trait(self, name: str, description: str, modifiers: dict[str, f
         )
         return cursor.lastrowid
 
+    async def update_trait_modifiers(self, trait_id: int, modifiers: dict[str, float]) -> bool:
+        cursor = await self.db.execute(
+            "UPDATE traits SET modifiers = ? WHERE id = ?",
+            self.db.serialize_payload(modifiers),
+            trait_id,
+        )
+        return cursor.rowcount > 0
+
     async def create_item(
         self,
         name: str,
@@ -109,6 +156,23 @@ async def create_item(
         )
         return cursor.lastrowid
 
+    async def update_item_price(self, item_id: int, price: int, currency_id: int = 0) -> bool:
+        cursor = await self.db.execute(
+            "UPDATE items SET price = ?, currency_id = ? WHERE id = ?",
+            price,
+            currency_id,
+            item_id,
+        )
+        return cursor.rowcount > 0
+
+    async def update_item_modifiers(self, item_id: int, modifiers: dict[str, float]) -> bool:
+        cursor = await self.db.execute(
+            "UPDATE items SET modifiers = ? WHERE id = ?",
+            self.db.serialize_payload(modifiers),
+            item_id,
+        )
+        return cursor.rowcount > 0
+
     async def create_enemy(
         self,
         name: str,
@@ -118,6 +182,7 @@ async def create_enemy(
         rewards: dict[str, Any],
         is_boss: bool = False,
     ) -> int:
+        await self._check_rewards(rewards)
         cursor = await self.db.execute(
             "INSERT INTO enemies (name, description, level, stats, rewards, is_boss) VALUES (?, ?, ?, ?, ?, ?)",
             name,
@@ -129,6 +194,15 @@ async def create_enemy(
         )
         return cursor.lastrowid
 
+    async def update_enemy_stats(self, enemy_id: int, level: int, stats: dict[str, Any]) -> bool:
+        cursor = await self.db.execute(
+            "UPDATE enemies SET level = ?, stats = ?, version = version + 1 WHERE id = ?",
+            level,
+            self.db.serialize_payload(stats),
+            enemy_id,
+        )
+        return cursor.rowcount > 0
+
     async def create_quest(
         self,
         name: str,
@@ -136,6 +210,7 @@ async def create_quest(
         required_level: int,
         rewards: dict[str, Any],
     ) -> int:
+        await self._check_rewards(rewards)
         cursor = await self.db.execute(
             "INSERT INTO quests (name, description, required_level, rewards) VALUES (?, ?, ?, ?)",
             name,
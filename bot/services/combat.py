@@ -1,12 +1,19 @@
-"""Lightweight combat simulation utilities."""
+"""Combat: enemies, turn-based battles and win-rate simulation."""
 from __future__ import annotations
 
 import random
-from dataclasses import dataclass
-from typing import Iterable
+import secrets
+import time
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Any, Iterable
 
 from ..database import Database
-from ..models import Enemy, Player
+from ..models import Enemy, Player, RPGClass, Skill
+from ..rows import class_from_row, enemy_from_row, skill_from_row
+from .engine import MAX_TURNS, Combatant, FightResult, pack_party, resolve_fight, unpack_party
+
+if TYPE_CHECKING:
+    from .simulator import SimulationCell
 
 
 @dataclass(slots=True)
@@ -14,81 +21,204 @@ class BattleResult:
     success: bool
     log: list[str]
     rewards: dict[str, int | list[int]]
+    turns: int = 0
+    seed: int = 0
+    replay_id: int | None = None
+
+
+@dataclass(slots=True)
+class BattleReplay:
+    id: int
+    enemy_id: int
+    enemy_version: int
+    seed: int
+    success: bool
+    turns: int
+    user_ids: list[int]
+    created_at: float
+
+
+# Expired replays are deleted at most this often, from ``battle``.
+_REPLAY_PRUNE_INTERVAL = 3600.0
 
 
 class CombatService:
-    def __init__(self, db: Database):
+    """Enemies, battles and their replays.
+
+    Replays older than ``replay_retention_days`` are deleted as new battles
+    are recorded; a retention of zero keeps every replay.
+    """
+
+    def __init__(self, db: Database, *, replay_retention_days: float = 30.0):
         self.db = db
+        self.replay_retention_days = replay_retention_days
+        self._replays_pruned_at = 0.0
 
     async def fetch_enemy(self, enemy_id: int) -> Enemy | None:
         row = await self.db.fetch_one("SELECT * FROM enemies WHERE id = ?", enemy_id)
-        if not row:
-            return None
-        return Enemy(
-            id=row["id"],
-            name=row["name"],
-            description=row.get("description", ""),
-            level=row["level"],
-            stats=self.db.deserialize_payload(row.get("stats")),
-            rewards=self.db.deserialize_payload(row.get("rewards")),
-            is_boss=bool(row.get("is_boss")),
+        return enemy_from_row(row) if row else None
+
+    async def list_classes(self) -> list[RPGClass]:
+        rows = await self.db.fetch_all("SELECT * FROM classes ORDER BY id")
+        return [class_from_row(row) for row in rows]
+
+    async def class_skills(self) -> dict[int, list[Skill]]:
+        rows = await self.db.fetch_all(
+            """
+            SELECT cs.class_id, s.* FROM class_skills cs
+            JOIN skills s ON s.id = cs.skill_id
+            ORDER BY cs.class_id, s.id
+            """
         )
+        skills: dict[int, list[Skill]] = {}
+        for row in rows:
+            skills.setdefault(row["class_id"], []).append(skill_from_row(row))
+        return skills
 
-    async def battle(self, players: Iterable[Player], enemy: Enemy) -> BattleResult:
-        player_stat_blocks = [player.calculate_stats() for player in players]
-        total_constitution = sum(stats.get("constitution", 0.0) for stats in player_stat_blocks)
-        total_agility = sum(stats.get("agility", 0.0) for stats in player_stat_blocks)
-        total_defense = sum(stats.get("defense", 0.0) for stats in player_stat_blocks)
-        total_endurance = sum(stats.get("endurance", 0.0) for stats in player_stat_blocks)
-        total_dantian = sum(stats.get("dantian_size", 0.0) for stats in player_stat_blocks)
-        total_strength = sum(stats.get("strength", 0.0) for stats in player_stat_blocks)
-        total_spirit = sum(stats.get("spirit", 0.0) for stats in player_stat_blocks)
-
-        player_power = (
-            total_strength
-            + total_spirit
-            + (total_agility * 0.5)
-            + (total_endurance * 0.25)
-            + (total_dantian * 0.25)
+    async def simulate(self, enemy: Enemy, *, class_id: int | None = None, **options: Any) -> list[SimulationCell]:
+        """Estimate win rates against ``enemy`` off the event loop.
+
+        With ``class_id`` every simulated member has that class; otherwise
+        members are drawn from all classes, plus unassigned players when no
+        classes exist. ``options`` are passed to ``simulate_enemy``.
+        """
+        from .simulator import simulate_enemy_async
+
+        classes: list[RPGClass | None] = list(await self.list_classes())
+        skills = await self.class_skills()
+        if class_id is not None:
+            classes = [rpg_class for rpg_class in classes if rpg_class and rpg_class.id == class_id]
+            if not classes:
+                raise ValueError("Class not found.")
+            return await simulate_enemy_async(enemy, classes, skills=skills, **options)
+        return await simulate_enemy_async(enemy, classes or [None], skills=skills, mixed=True, **options)
+
+    async def battle(self, players: Iterable[Player], enemy: Enemy, *, seed: int | None = None) -> BattleResult:
+        """Fight ``enemy`` turn by turn; see ``engine.resolve_fight`` for the rules.
+
+        Every roll comes from a ``random.Random`` seeded with ``seed``, or with
+        a fresh random seed when it is omitted. The seed, the enemy version and
+        a binary snapshot of the party are stored in ``battle_replays``, so
+        ``replay`` can play the fight again.
+        """
+        players = list(players)
+        if seed is None:
+            seed = secrets.randbits(63)
+        party = [Combatant.for_player(player) for player in players]
+        fight = resolve_fight(party, Combatant.for_enemy(enemy, len(party)), random.Random(seed))
+        now = time.time()
+        cursor = await self.db.execute(
+            """
+            INSERT INTO battle_replays (enemy_id, enemy_version, seed, success, turns, party, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            enemy.id,
+            enemy.version,
+            seed,
+            int(fight.won),
+            fight.turns,
+            pack_party(party, [player.id for player in players]),
+            now,
         )
-        player_resilience = total_constitution + total_defense
-
-        def enemy_stat(key: str, *aliases: str, default: float) -> float:
-            for candidate in (key, *aliases):
-                if candidate in enemy.stats:
-                    try:
-                        return float(enemy.stats[candidate])
-                    except (TypeError, ValueError):
-                        break
-            return default
-
-        enemy_strength = enemy_stat("strength", "power", "attack", default=enemy.level * 8)
-        enemy_spirit = enemy_stat("spirit", "magic", default=enemy.level * 6)
-        enemy_agility = enemy_stat("agility", default=enemy.level * 4)
-        enemy_endurance = enemy_stat("endurance", default=enemy.level * 5)
-        enemy_dantian = enemy_stat("dantian_size", "qi", default=enemy.level * 3)
-        enemy_defense = enemy_stat("defense", default=enemy.level * 5)
-        enemy_constitution = enemy_stat("constitution", "hp", default=enemy.level * 12)
-
-        enemy_effective_power = (
-            enemy_strength
-            + enemy_spirit
-            + (enemy_agility * 0.5)
-            + (enemy_endurance * 0.25)
-            + (enemy_dantian * 0.25)
+        await self._prune_replays(now)
+        log, rewards = self._describe(enemy, party, fight)
+        return BattleResult(
+            success=fight.won,
+            log=log,
+            rewards=rewards,
+            turns=fight.turns,
+            seed=seed,
+            replay_id=cursor.lastrowid,
         )
-        enemy_resilience = enemy_constitution + enemy_defense
 
+    async def _prune_replays(self, now: float) -> None:
+        if self.replay_retention_days <= 0 or now - self._replays_pruned_at < _REPLAY_PRUNE_INTERVAL:
+            return
+        self._replays_pruned_at = now
+        await self.db.execute(
+            "DELETE FROM battle_replays WHERE created_at < ?",
+            now - self.replay_retention_days * 86400,
+        )
+
+    async def replay(self, replay_id: int) -> tuple[BattleReplay, BattleResult]:
+        """Play a recorded battle again from its seed and party snapshot.
+
+        Raises ``ValueError`` if the replay is unknown or expired, or if its enemy has
+        been deleted or changed since, because the fight could no longer be
+        reproduced.
+        """
+        row = await self.db.fetch_one("SELECT * FROM battle_replays WHERE id = ?", replay_id)
+        if not row:
+            raise ValueError("Replay not found.")
+        enemy = await self.fetch_enemy(row["enemy_id"])
+        if not enemy:
+            raise ValueError("The enemy from this battle no longer exists.")
+        if enemy.version != row["enemy_version"]:
+            raise ValueError(
+                f"{enemy.name} has changed since this battle (version {row['enemy_version']},"
+                f" now {enemy.version}), so it cannot be replayed."
+            )
+        try:
+            user_ids, party = unpack_party(row["party"])
+        except ValueError as exc:
+            raise ValueError("This replay was recorded by an older combat engine.") from exc
+        skill_ids = sorted({skill_id for member in party for skill_id in member.skill_ids})
+        names: dict[int, str] = {}
+        if skill_ids:
+            rows = await self.db.fetch_all(
+                f"SELECT id, name FROM skills WHERE id IN ({', '.join('?' * len(skill_ids))})",
+                *skill_ids,
+            )
+            names = {skill["id"]: skill["name"] for skill in rows}
+        party = [
+            replace(
+                member,
+                skill_names=tuple(names.get(skill_id, f"Skill #{skill_id}") for skill_id in member.skill_ids),
+            )
+            for member in party
+        ]
+        fight = resolve_fight(party, Combatant.for_enemy(enemy, len(party)), random.Random(row["seed"]))
+        log, rewards = self._describe(enemy, party, fight)
+        record = BattleReplay(
+            id=row["id"],
+            enemy_id=row["enemy_id"],
+            enemy_version=row["enemy_version"],
+            seed=row["seed"],
+            success=bool(row["success"]),
+            turns=row["turns"],
+            user_ids=user_ids,
+            created_at=row["created_at"],
+        )
+        result = BattleResult(
+            success=fight.won,
+            log=log,
+            rewards=rewards,
+            turns=fight.turns,
+            seed=record.seed,
+            replay_id=record.id,
+        )
+        return record, result
+
+    def _describe(
+        self, enemy: Enemy, party: list[Combatant], fight: FightResult
+    ) -> tuple[list[str], dict[str, int | list[int]]]:
         log = [f"Encountered {enemy.name} (Lv {enemy.level})."]
-        chance = (player_power + player_resilience) / max(1.0, enemy_effective_power + enemy_resilience)
-        chance = min(0.95, max(0.05, chance))
-        roll = random.random()
-        log.append(f"Party power ratio {chance:.2f}, roll {roll:.2f}.")
-        success = roll <= chance
-        if success:
+        used: dict[str, int] = {}
+        for member, counts in zip(party, fight.skill_uses):
+            for name, count in zip(member.skill_names, counts):
+                if count:
+                    used[name] = used.get(name, 0) + count
+        if used:
+            log.append("Skills used: " + ", ".join(f"{name} x{count}" for name, count in used.items()) + ".")
+        log.append(
+            f"The fight lasted {fight.turns} turns; the party dealt {sum(fight.damage):,.0f} damage"
+            f" and {fight.survivors}/{len(party)} members are still standing."
+        )
+        if fight.won:
             log.append("Enemy defeated! Loot distributed among party members.")
-            rewards = enemy.rewards or {}
+            return log, enemy.rewards or {}
+        if fight.survivors:
+            log.append(f"The party could not bring the enemy down within {MAX_TURNS} turns and retreats to recover.")
         else:
             log.append("The party was defeated and retreats to recover.")
-            rewards = {}
-        return BattleResult(success=success, log=log, rewards=rewards)
+        return log, {}
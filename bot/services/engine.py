@@ -0,0 +1,429 @@
+"""Turn-based resolution of a party fighting a single enemy.
+
+Participants are compiled once per fight into ``Combatant`` records holding
+their HP, stamina and qi pools and their skills, strongest first. The turn
+loop then only reads and writes flat per-member lists allocated up front, so a
+100-turn fight costs a few hundred list operations and no per-turn dicts.
+
+``resolve_batch`` runs the same rules for many independent fights at once on
+NumPy arrays, one row per fight; the simulator uses it to estimate win rates.
+
+``pack_party`` and ``unpack_party`` store compiled combatants as a compact
+binary snapshot. Together with the seed of the ``random.Random`` that drove a
+fight, the snapshot lets the fight be played again exactly.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+import random
+import struct
+from typing import Any, Sequence
+
+from ..models import Enemy, Player, Skill
+from ..stats import StatBlock
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+MAX_TURNS = 100
+HP_PER_CONSTITUTION = 10.0
+STAMINA_PER_ENDURANCE = 5.0
+QI_PER_DANTIAN = 5.0
+# Share of each resource pool recovered at the end of every turn.
+REGEN_RATE = 0.1
+# Every hit lands between 75% and 125% of its base damage.
+DAMAGE_VARIANCE = 0.25
+# Crit chance tends towards CRIT_CAP as the attacker's agility dwarfs the
+# target's; evenly matched agility gives half of it.
+CRIT_CAP = 0.3
+CRIT_MULTIPLIER = 1.5
+# Enemy stats are sized against a whole party's summed combat power. Turn by
+# turn a lone enemy's HP and damage both weigh against every member, so fights
+# use a fraction of them, tuned so a full party of ``ENEMY_PARTY_SIZE`` at the
+# enemy's level wins about 70% of the time.
+ENEMY_STAT_SCALE = 0.29
+ENEMY_PARTY_SIZE = 4
+# Smaller parties face a smaller enemy: its HP shrinks with the party's share
+# of a full party, and its attack with that share to this power. The enemy
+# strikes once a turn whatever the party size, so each hit must shrink too, but
+# more slowly than HP, so that every extra member still helps. At the enemy's
+# level one to four members then win roughly 30%, 40%, 55% and 70% of fights.
+ENEMY_ATTACK_EXPONENT = 0.6
+
+# Resource codes for compiled skills. Energy skills split their cost evenly
+# between stamina and qi.
+STAMINA = 0
+QI = 1
+ENERGY = 2
+_RESOURCE_CODES = {"stamina": STAMINA, "qi": QI, "energy": ENERGY}
+
+# Snapshot layout: a header with the format and party size, then per member
+# their user ID, the six combatant figures and a skill count, followed by
+# ``(skill ID, damage, cost, resource)`` per skill. Bump REPLAY_FORMAT whenever
+# the layout or the fight rules change, so old snapshots are not replayed
+# under different rules.
+REPLAY_FORMAT = 2
+_HEADER = struct.Struct("<BB")
+_MEMBER = struct.Struct("<q6dB")
+_SKILL = struct.Struct("<i2dB")
+
+
+def skill_damage(skill: Skill, stats: StatBlock) -> float:
+    """Base damage of ``skill`` for a user with ``stats``."""
+    scaling = skill.scaling_stat
+    if scaling == "strength":
+        base = stats.strength
+    elif scaling == "spirit":
+        base = stats.spirit
+    else:
+        base = (stats.strength + stats.spirit) / 2
+    return base * skill.damage_multiplier
+
+
+def mitigate(damage: Any, defense: Any) -> Any:
+    """Damage left after ``defense``; works on floats and arrays alike."""
+    return damage * damage / (damage + defense + 1.0)
+
+
+@dataclass(frozen=True, slots=True)
+class Combatant:
+    """Fight-ready numbers for one participant, derived once from stats."""
+
+    max_hp: float
+    max_stamina: float
+    max_qi: float
+    defense: float
+    agility: float
+    # Damage of the free basic attack.
+    attack: float
+    # ``(damage, cost, resource code)`` per usable skill, strongest first.
+    skills: tuple[tuple[float, float, int], ...] = ()
+    skill_ids: tuple[int, ...] = ()
+    skill_names: tuple[str, ...] = ()
+
+    @classmethod
+    def from_stats(cls, stats: StatBlock, skills: Sequence[Skill] = ()) -> Combatant:
+        attack = max(stats.strength, stats.spirit)
+        ranked = sorted(
+            ((skill_damage(skill, stats), skill) for skill in skills),
+            key=lambda pair: pair[0],
+            reverse=True,
+        )
+        # A skill that hits no harder than the basic attack is never worth its cost.
+        usable = [(damage, skill) for damage, skill in ranked if damage > attack]
+        return cls(
+            max_hp=max(1.0, stats.constitution * HP_PER_CONSTITUTION),
+            max_stamina=stats.endurance * STAMINA_PER_ENDURANCE,
+            max_qi=stats.dantian_size * QI_PER_DANTIAN,
+            defense=stats.defense,
+            agility=stats.agility,
+            attack=attack,
+            skills=tuple(
+                (damage, float(max(0, skill.cost)), _RESOURCE_CODES[skill.resource]) for damage, skill in usable
+            ),
+            skill_ids=tuple(skill.id for _, skill in usable),
+            skill_names=tuple(skill.name for _, skill in usable),
+        )
+
+    @classmethod
+    def for_player(cls, player: Player) -> Combatant:
+        return cls.from_stats(player.calculate_stats(), player.skills)
+
+    @classmethod
+    def for_enemy(cls, enemy: Enemy, party_size: int) -> Combatant:
+        """``enemy`` sized for a party of ``party_size``; see ``ENEMY_ATTACK_EXPONENT``."""
+        full = cls.from_stats(enemy.stat_block * ENEMY_STAT_SCALE)
+        share = party_size / ENEMY_PARTY_SIZE
+        return replace(full, max_hp=full.max_hp * share, attack=full.attack * share**ENEMY_ATTACK_EXPONENT)
+
+
+def pack_party(party: Sequence[Combatant], user_ids: Sequence[int]) -> bytes:
+    """Serialize ``party`` for a replay; ``user_ids`` records who each member was."""
+    chunks = [_HEADER.pack(REPLAY_FORMAT, len(party))]
+    for user_id, member in zip(user_ids, party, strict=True):
+        chunks.append(
+            _MEMBER.pack(
+                user_id,
+                member.max_hp,
+                member.max_stamina,
+                member.max_qi,
+                member.defense,
+                member.agility,
+                member.attack,
+                len(member.skills),
+            )
+        )
+        for skill_id, (damage, cost, resource) in zip(member.skill_ids, member.skills, strict=True):
+            chunks.append(_SKILL.pack(skill_id, damage, cost, resource))
+    return b"".join(chunks)
+
+
+def unpack_party(blob: bytes) -> tuple[list[int], list[Combatant]]:
+    """Read a ``pack_party`` snapshot back as user IDs and combatants.
+
+    Skill names are not stored; the combatants come back without them. Raises
+    ``ValueError`` for snapshots in another format.
+    """
+    view = memoryview(blob)
+    version, size = _HEADER.unpack_from(view)
+    if version != REPLAY_FORMAT:
+        raise ValueError(f"replay format {version} is not supported (expected {REPLAY_FORMAT})")
+    offset = _HEADER.size
+    user_ids: list[int] = []
+    party: list[Combatant] = []
+    for _ in range(size):
+        user_id, max_hp, max_stamina, max_qi, defense, agility, attack, count = _MEMBER.unpack_from(view, offset)
+        offset += _MEMBER.size
+        skills = []
+        skill_ids = []
+        for _ in range(count):
+            skill_id, damage, cost, resource = _SKILL.unpack_from(view, offset)
+            offset += _SKILL.size
+            skill_ids.append(skill_id)
+            skills.append((damage, cost, resource))
+        user_ids.append(user_id)
+        party.append(
+            Combatant(
+                max_hp=max_hp,
+                max_stamina=max_stamina,
+                max_qi=max_qi,
+                defense=defense,
+                agility=agility,
+                attack=attack,
+                skills=tuple(skills),
+                skill_ids=tuple(skill_ids),
+            )
+        )
+    return user_ids, party
+
+
+def crit_chance(attacker_agility: Any, target_agility: Any) -> Any:
+    return CRIT_CAP * attacker_agility / (attacker_agility + target_agility + 1.0)
+
+
+@dataclass(slots=True)
+class FightResult:
+    won: bool
+    turns: int
+    enemy_hp: float
+    # Per party member, in the order the party was given.
+    hp: list[float]
+    damage: list[float]
+    skill_uses: list[list[int]] = field(default_factory=list)
+
+    @property
+    def survivors(self) -> int:
+        return sum(1 for value in self.hp if value > 0)
+
+
+def resolve_fight(
+    party: Sequence[Combatant],
+    enemy: Combatant,
+    rng: random.Random,
+    *,
+    max_turns: int = MAX_TURNS,
+) -> FightResult:
+    """Fight until the enemy or the whole party falls, or ``max_turns`` pass.
+
+    Each turn every standing member uses their strongest skill they can pay
+    for, or a basic attack, then the enemy strikes a random standing member
+    and everyone regenerates ``REGEN_RATE`` of their stamina and qi. The party
+    loses if the enemy is still standing after ``max_turns``.
+    """
+    size = len(party)
+    hp = [member.max_hp for member in party]
+    stamina = [member.max_stamina for member in party]
+    qi = [member.max_qi for member in party]
+    damage = [0.0] * size
+    uses = [[0] * len(member.skills) for member in party]
+    # Everything the loop reads is copied into flat lists once, so a turn is
+    # list indexing and float arithmetic only.
+    attack = [member.attack for member in party]
+    skills = [tuple(enumerate(member.skills)) for member in party]
+    defense = [member.defense + 1.0 for member in party]
+    max_stamina = [member.max_stamina for member in party]
+    max_qi = [member.max_qi for member in party]
+    stamina_regen = [member.max_stamina * REGEN_RATE for member in party]
+    qi_regen = [member.max_qi * REGEN_RATE for member in party]
+    crit_dealt = [crit_chance(member.agility, enemy.agility) for member in party]
+    crit_taken = [crit_chance(enemy.agility, member.agility) for member in party]
+    standing = list(range(size))
+    enemy_hp = enemy.max_hp
+    enemy_attack = enemy.attack
+    enemy_defense = enemy.defense + 1.0
+    low = 1.0 - DAMAGE_VARIANCE
+    spread = 2.0 * DAMAGE_VARIANCE
+    roll = rng.random
+    turn = 0
+    won = False
+    while standing and turn < max_turns:
+        turn += 1
+        for index in standing:
+            raw = attack[index]
+            for slot, (skill_hit, cost, resource) in skills[index]:
+                if resource == STAMINA:
+                    if stamina[index] < cost:
+                        continue
+                    stamina[index] -= cost
+                elif resource == QI:
+                    if qi[index] < cost:
+                        continue
+                    qi[index] -= cost
+                else:
+                    half = cost / 2
+                    if stamina[index] < half or qi[index] < half:
+                        continue
+                    stamina[index] -= half
+                    qi[index] -= half
+                raw = skill_hit
+                uses[index][slot] += 1
+                break
+            raw *= low + spread * roll()
+            if roll() < crit_dealt[index]:
+                raw *= CRIT_MULTIPLIER
+            # ``mitigate`` inlined; this is the hottest line of a fight.
+            dealt = raw * raw / (raw + enemy_defense)
+            damage[index] += dealt
+            enemy_hp -= dealt
+        if enemy_hp <= 0:
+            won = True
+            break
+        target = standing[int(roll() * len(standing))]
+        raw = enemy_attack * (low + spread * roll())
+        if roll() < crit_taken[target]:
+            raw *= CRIT_MULTIPLIER
+        hp[target] -= raw * raw / (raw + defense[target])
+        if hp[target] <= 0:
+            standing.remove(target)
+        for index in standing:
+            value = stamina[index] + stamina_regen[index]
+            cap = max_stamina[index]
+            stamina[index] = value if value < cap else cap
+            value = qi[index] + qi_regen[index]
+            cap = max_qi[index]
+            qi[index] = value if value < cap else cap
+    return FightResult(
+        won=won,
+        turns=turn,
+        enemy_hp=max(0.0, enemy_hp),
+        hp=[max(0.0, value) for value in hp],
+        damage=damage,
+        skill_uses=uses,
+    )
+
+
+@dataclass(slots=True)
+class BatchParty:
+    """Combatant fields as ``fights x members`` arrays for ``resolve_batch``.
+
+    Skill fields are ``fights x members x slots``; unused slots carry zero
+    damage and an infinite cost.
+    """
+
+    max_hp: Any
+    max_stamina: Any
+    max_qi: Any
+    defense: Any
+    agility: Any
+    attack: Any
+    skill_damage: Any
+    skill_cost: Any
+    skill_resource: Any
+
+    @classmethod
+    def from_profiles(cls, profiles: Sequence[Combatant], picks: Any, levels: Any) -> BatchParty:
+        """Build members from level 1 ``profiles``.
+
+        ``picks`` holds the profile index of each member and ``levels`` their
+        level, both ``fights x members``. Everything but skill costs scales
+        linearly with level.
+        """
+        slots = max(1, max(len(profile.skills) for profile in profiles))
+        skill_damage = np.zeros((len(profiles), slots))
+        skill_cost = np.full((len(profiles), slots), np.inf)
+        skill_resource = np.zeros((len(profiles), slots), dtype=np.int8)
+        for row, profile in enumerate(profiles):
+            for slot, (damage, cost, resource) in enumerate(profile.skills):
+                skill_damage[row, slot] = damage
+                skill_cost[row, slot] = cost
+                skill_resource[row, slot] = resource
+
+        def scaled(name: str) -> Any:
+            return np.array([getattr(profile, name) for profile in profiles])[picks] * levels
+
+        return cls(
+            max_hp=scaled("max_hp"),
+            max_stamina=scaled("max_stamina"),
+            max_qi=scaled("max_qi"),
+            defense=scaled("defense"),
+            agility=scaled("agility"),
+            attack=scaled("attack"),
+            skill_damage=skill_damage[picks] * levels[..., None],
+            skill_cost=skill_cost[picks],
+            skill_resource=skill_resource[picks],
+        )
+
+
+def resolve_batch(
+    party: BatchParty,
+    enemy: Combatant,
+    rng: Any,
+    *,
+    max_turns: int = MAX_TURNS,
+) -> Any:
+    """Vectorized ``resolve_fight`` over independent fights; returns who won.
+
+    Requires NumPy. ``rng`` is a ``numpy.random.Generator``. The rules match
+    ``resolve_fight`` exactly, but the random streams differ, so a single fight
+    does not replay identically between the two.
+    """
+    if np is None:
+        raise RuntimeError("resolve_batch requires numpy")
+    fights, size = party.max_hp.shape
+    slots = party.skill_damage.shape[2]
+    hp = party.max_hp.astype(float, copy=True)
+    stamina = party.max_stamina.astype(float, copy=True)
+    qi = party.max_qi.astype(float, copy=True)
+    resource = party.skill_resource
+    half_cost = np.where(resource == ENERGY, party.skill_cost / 2, 0.0)
+    stamina_cost = np.where(resource == STAMINA, party.skill_cost, half_cost)
+    qi_cost = np.where(resource == QI, party.skill_cost, half_cost)
+    crit_dealt = crit_chance(party.agility, enemy.agility)
+    crit_taken = crit_chance(enemy.agility, party.agility)
+    enemy_hp = np.full(fights, enemy.max_hp)
+    won = np.zeros(fights, dtype=bool)
+    active = np.ones(fights, dtype=bool)
+    rows = np.arange(fights)
+    low = 1.0 - DAMAGE_VARIANCE
+    spread = 2.0 * DAMAGE_VARIANCE
+    for _ in range(max_turns):
+        for index in range(size):
+            acting = active & (hp[:, index] > 0)
+            raw = party.attack[:, index].astype(float, copy=True)
+            chosen = ~acting
+            for slot in range(slots):
+                need_stamina = stamina_cost[:, index, slot]
+                need_qi = qi_cost[:, index, slot]
+                pick = ~chosen & (stamina[:, index] >= need_stamina) & (qi[:, index] >= need_qi)
+                stamina[:, index] -= np.where(pick, need_stamina, 0.0)
+                qi[:, index] -= np.where(pick, need_qi, 0.0)
+                raw = np.where(pick, party.skill_damage[:, index, slot], raw)
+                chosen |= pick
+            raw *= low + spread * rng.random(fights)
+            raw *= np.where(rng.random(fights) < crit_dealt[:, index], CRIT_MULTIPLIER, 1.0)
+            enemy_hp -= np.where(acting, mitigate(raw, enemy.defense), 0.0)
+        won |= active & (enemy_hp <= 0)
+        active &= enemy_hp > 0
+        standing = hp > 0
+        target = np.where(standing, rng.random((fights, size)), -1.0).argmax(axis=1)
+        raw = enemy.attack * (low + spread * rng.random(fights))
+        raw *= np.where(rng.random(fights) < crit_taken[rows, target], CRIT_MULTIPLIER, 1.0)
+        hp[rows, target] -= np.where(active, mitigate(raw, party.defense[rows, target]), 0.0)
+        active &= (hp > 0).any(axis=1)
+        if not active.any():
+            break
+        np.minimum(party.max_stamina, stamina + party.max_stamina * REGEN_RATE, out=stamina)
+        np.minimum(party.max_qi, qi + party.max_qi * REGEN_RATE, out=qi)
+    return won
@@ -0,0 +1,262 @@
+"""Append-only audit ledger for coin and currency movements."""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import logging
+import time
+from typing import Any, Iterable
+
+from ..database import Database
+
+log = logging.getLogger(__name__)
+
+# ``currency_id`` used for ``users.coins``; real currencies start at 1.
+COINS = 0
+
+
+@dataclass(frozen=True, slots=True)
+class LedgerEntry:
+    user_id: int
+    amount: int
+    reason: str
+    currency_id: int = COINS
+    created_at: float = 0.0
+
+
+class LedgerService:
+    """Record every balance change without adding a write per change.
+
+    Entries are buffered in memory and written with one ``executemany`` when
+    ``flush_size`` entries are waiting or every ``flush_interval`` seconds,
+    whichever comes first. Balances stay authoritative in ``users.coins`` and
+    ``user_currencies``; the ledger is the audit trail behind them.
+
+    Every ``snapshot_interval`` seconds the rows written since the previous
+    snapshot are folded into ``ledger_snapshots``, one running balance per user
+    and currency. Rebuilding a balance then reads one snapshot plus the rows
+    after it. Rows already folded into a snapshot and older than
+    ``retention_days`` are deleted; a retention of zero keeps the full history.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        *,
+        flush_size: int = 500,
+        flush_interval: float = 5.0,
+        snapshot_interval: float = 3600.0,
+        retention_days: float = 30.0,
+    ):
+        if flush_size < 1:
+            raise ValueError("flush_size must be at least 1")
+        if flush_interval <= 0:
+            raise ValueError("flush_interval must be positive")
+        self.db = db
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.snapshot_interval = snapshot_interval
+        self.retention_days = retention_days
+        self._buffer: list[LedgerEntry] = []
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task[None] | None = None
+        self._last_snapshot = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    async def start(self) -> None:
+        seeded = await self.seed_opening_balances()
+        if seeded:
+            log.info("Seeded opening ledger balances for %d accounts", seeded)
+        self._last_snapshot = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def record(self, user_id: int, amount: int, reason: str, *, currency_id: int = COINS) -> None:
+        if amount:
+            self._append([LedgerEntry(user_id, amount, reason, currency_id, time.time())])
+
+    def record_many(self, entries: Iterable[tuple[int, int]], reason: str, *, currency_id: int = COINS) -> None:
+        """Record ``(user_id, amount)`` pairs that share a reason and currency."""
+        now = time.time()
+        self._append(
+            [LedgerEntry(user_id, amount, reason, currency_id, now) for user_id, amount in entries if amount]
+        )
+
+    def _append(self, entries: list[LedgerEntry]) -> None:
+        self._buffer.extend(entries)
+        if len(self._buffer) >= self.flush_size:
+            self._flush_requested.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+                if self.snapshot_interval > 0 and time.monotonic() - self._last_snapshot >= self.snapshot_interval:
+                    await self.snapshot()
+            except Exception:  # noqa: BLE001
+                log.exception("Ledger maintenance failed")
+
+    async def flush(self) -> int:
+        """Write buffered entries; returns how many were written."""
+        async with self._flush_lock:
+            self._flush_requested.clear()
+            entries, self._buffer = self._buffer, []
+            if not entries:
+                return 0
+            try:
+                await self.db.executemany(
+                    "INSERT INTO ledger (user_id, currency_id, amount, reason, created_at) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (entry.user_id, entry.currency_id, entry.amount, entry.reason, entry.created_at)
+                        for entry in entries
+                    ],
+                )
+            except Exception:
+                # Keep the entries so the next flush retries them.
+                self._buffer[:0] = entries
+                raise
+            return len(entries)
+
+    async def seed_opening_balances(self) -> int:
+        """Snapshot existing balances for accounts that have no ledger history.
+
+        Balances that predate the ledger, or were set outside it, would never
+        reconcile otherwise. Accounts with ledger rows are left alone.
+        """
+        now = time.time()
+        async with self.db.transaction():
+            coins = await self.db.execute(
+                """
+                INSERT INTO ledger_snapshots (user_id, currency_id, balance, ledger_id, created_at)
+                SELECT u.id, ?1, u.coins, 0, ?2 FROM users u
+                WHERE u.coins != 0
+                    AND NOT EXISTS (SELECT 1 FROM ledger_snapshots s WHERE s.user_id = u.id AND s.currency_id = ?1)
+                    AND NOT EXISTS (SELECT 1 FROM ledger l WHERE l.user_id = u.id AND l.currency_id = ?1)
+                """,
+                COINS,
+                now,
+            )
+            currencies = await self.db.execute(
+                """
+                INSERT INTO ledger_snapshots (user_id, currency_id, balance, ledger_id, created_at)
+                SELECT uc.user_id, uc.currency_id, uc.amount, 0, ?1 FROM user_currencies uc
+                WHERE uc.amount != 0
+                    AND NOT EXISTS (
+                        SELECT 1 FROM ledger_snapshots s
+                        WHERE s.user_id = uc.user_id AND s.currency_id = uc.currency_id
+                    )
+                    AND NOT EXISTS (
+                        SELECT 1 FROM ledger l
+                        WHERE l.user_id = uc.user_id AND l.currency_id = uc.currency_id
+                    )
+                """,
+                now,
+            )
+        return coins.rowcount + currencies.rowcount
+
+    async def snapshot(self) -> int:
+        """Fold new ledger rows into the running snapshots, then compact.
+
+        Returns the number of snapshots updated.
+        """
+        await self.flush()
+        self._last_snapshot = time.monotonic()
+        now = time.time()
+        async with self.db.transaction():
+            # ``ledger_id`` marks the last row folded into a snapshot; every run
+            # folds all rows up to the same cutoff, so the largest one is where
+            # the previous run stopped.
+            bounds = await self.db.fetch_one(
+                """
+                SELECT
+                    (SELECT COALESCE(MAX(ledger_id), 0) FROM ledger_snapshots) AS previous,
+                    (SELECT COALESCE(MAX(id), 0) FROM ledger) AS cutoff
+                """
+            )
+            previous, cutoff = bounds["previous"], bounds["cutoff"]
+            updated = 0
+            if cutoff > previous:
+                cursor = await self.db.execute(
+                    """
+                    INSERT INTO ledger_snapshots (user_id, currency_id, balance, ledger_id, created_at)
+                    SELECT user_id, currency_id, SUM(amount), ?2, ?3 FROM ledger
+                    WHERE id > ?1 AND id <= ?2
+                    GROUP BY user_id, currency_id
+                    ON CONFLICT(user_id, currency_id) DO UPDATE SET
+                        balance = balance + excluded.balance,
+                        ledger_id = excluded.ledger_id,
+                        created_at = excluded.created_at
+                    """,
+                    previous,
+                    cutoff,
+                    now,
+                )
+                updated = cursor.rowcount
+            if self.retention_days > 0:
+                await self.db.execute(
+                    "DELETE FROM ledger WHERE id <= ? AND created_at < ?",
+                    cutoff,
+                    now - self.retention_days * 86400,
+                )
+        return updated
+
+    async def balance(self, user_id: int, currency_id: int = COINS) -> int:
+        """Rebuild a balance from its snapshot plus the ledger rows after it."""
+        row = await self.db.fetch_one(
+            """
+            SELECT
+                COALESCE(s.balance, 0) + COALESCE((
+                    SELECT SUM(l.amount) FROM ledger l
+                    WHERE l.user_id = ?1 AND l.currency_id = ?2 AND l.id > COALESCE(s.ledger_id, 0)
+                ), 0) AS balance
+            FROM (SELECT 1)
+            LEFT JOIN ledger_snapshots s ON s.user_id = ?1 AND s.currency_id = ?2
+            """,
+            user_id,
+            currency_id,
+        )
+        return row["balance"] if row else 0
+
+    async def history(self, user_id: int, *, limit: int = 20) -> list[dict[str, Any]]:
+        await self.flush()
+        return await self.db.fetch_all(
+            "SELECT * FROM ledger WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+            user_id,
+            limit,
+        )
+
+    async def reconcile(self, *, limit: int = 50) -> list[dict[str, Any]]:
+        """Return coin balances that disagree with the ledger."""
+        await self.flush()
+        return await self.db.fetch_all(
+            """
+            SELECT u.id AS user_id, u.discord_id, u.coins AS stored,
+                COALESCE(s.balance, 0) + COALESCE((
+                    SELECT SUM(l.amount) FROM ledger l
+                    WHERE l.user_id = u.id AND l.currency_id = ?1 AND l.id > COALESCE(s.ledger_id, 0)
+                ), 0) AS ledger
+            FROM users u
+            LEFT JOIN ledger_snapshots s ON s.user_id = u.id AND s.currency_id = ?1
+            WHERE stored != ledger
+            ORDER BY u.id
+            LIMIT ?2
+            """,
+            COINS,
+            limit,
+        )
@@ -1,37 +1,178 @@
 """Client for interacting with the Lurkr leveling API."""
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Any
+import random
+from typing import Any, Iterable
 
 import aiohttp
 
+from ..ratelimit import CircuitBreaker, TokenBucket
+
 
 log = logging.getLogger(__name__)
 
 
 class LurkrClient:
-    """Minimal HTTP client for retrieving player level data from Lurkr."""
+    """Minimal HTTP client for retrieving player level data from Lurkr.
+
+    One ``aiohttp.ClientSession`` is shared by every request so connections,
+    TLS sessions and DNS lookups are reused. Call ``start`` when the bot boots
+    and ``close`` on shutdown; a request made before ``start`` opens the
+    session lazily.
+
+    Every request passes through a token bucket and a circuit breaker. 429 and
+    5xx responses are retried with jittered exponential backoff, and once
+    Lurkr keeps failing the breaker short-circuits lookups until it recovers.
+    """
 
-    def __init__(self, base_url: str | None, api_token: str | None) -> None:
+    def __init__(
+        self,
+        base_url: str | None,
+        api_token: str | None,
+        *,
+        timeout: float = 10.0,
+        connect_timeout: float = 5.0,
+        connection_limit: int = 20,
+        keepalive_timeout: float = 30.0,
+        dns_cache_ttl: int = 300,
+        rate_limit: float = 10.0,
+        max_concurrency: int = 5,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 10.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ) -> None:
         self.base_url = base_url.rstrip("/") if base_url else None
         self.api_token = api_token
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.connection_limit = connection_limit
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self._session: aiohttp.ClientSession | None = None
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.bucket = TokenBucket(rate_limit)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.base_url and self.api_token)
+
+    @property
+    def available(self) -> bool:
+        """Whether the circuit breaker currently lets requests through."""
+        return self.breaker.state != CircuitBreaker.OPEN
+
+    async def start(self) -> None:
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.connection_limit,
+            limit_per_host=self.connection_limit,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+        )
+        headers = {"Authorization": f"Bearer {self.api_token}"} if self.api_token else None
+        self._session = aiohttp.ClientSession(
+            headers=headers,
+            timeout=self.timeout,
+            connector=connector,
+        )
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            await self.start()
+        assert self._session is not None
+        return self._session
 
     async def fetch_level(self, discord_id: int) -> int | None:
         """Return the current Lurkr level for the given Discord member."""
-        if not self.base_url or not self.api_token:
+        if not self.configured:
             log.warning("Lurkr API configuration missing; skipping level lookup for %s", discord_id)
             return None
+        return await self._request_level(discord_id)
+
+    async def fetch_levels(self, discord_ids: Iterable[int]) -> dict[int, int]:
+        """Fetch many levels with at most ``max_concurrency`` requests in flight.
+
+        Members whose lookup fails are left out of the result.
+        """
+        if not self.configured:
+            log.warning("Lurkr API configuration missing; skipping bulk level lookup")
+            return {}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(discord_id: int) -> tuple[int, int | None]:
+            async with semaphore:
+                return discord_id, await self._request_level(discord_id)
+
+        results = await asyncio.gather(*(fetch(discord_id) for discord_id in set(discord_ids)))
+        return {discord_id: level for discord_id, level in results if level is not None}
+
+    def _backoff(self, attempt: int, retry_after: str | None = None) -> float:
+        if retry_after:
+            try:
+                return min(self.backoff_cap, float(retry_after))
+            except ValueError:
+                pass
+        # Full jitter keeps concurrent retries from synchronising.
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2**attempt))
+
+    async def _request_level(self, discord_id: int) -> int | None:
         url = f"{self.base_url}/levels/{discord_id}"
-        headers = {"Authorization": f"Bearer {self.api_token}"}
-        async with aiohttp.ClientSession(headers=headers) as session:
+        session = await self._get_session()
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                log.debug("Lurkr circuit open; skipping level lookup for %s", discord_id)
+                return None
+            retry_after = None
+            settled = False
             try:
-                async with session.get(url, timeout=10) as response:
-                    response.raise_for_status()
-                    payload: dict[str, Any] = await response.json()
+                await self.bucket.acquire()
+                async with session.get(url) as response:
+                    if response.status == 429:
+                        # Rate limited: Lurkr is up, so this is not a breaker failure.
+                        self.breaker.record_success()
+                        settled = True
+                        retry_after = response.headers.get("Retry-After")
+                        log.warning("Lurkr rate limited level lookup for %s", discord_id)
+                    elif response.status >= 500:
+                        self.breaker.record_failure()
+                        settled = True
+                        log.warning("Lurkr returned %s for %s", response.status, discord_id)
+                    else:
+                        self.breaker.record_success()
+                        settled = True
+                        if response.status == 404:
+                            return None
+                        response.raise_for_status()
+                        payload: dict[str, Any] = await response.json()
+                        break
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as exc:
+                self.breaker.record_failure()
+                settled = True
+                log.warning("Lurkr request for %s failed: %s", discord_id, exc)
             except Exception as exc:  # noqa: BLE001
                 log.exception("Failed fetching Lurkr level for %s: %s", discord_id, exc)
                 return None
+            finally:
+                if not settled:
+                    self.breaker.release()
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+        else:
+            log.error("Giving up on Lurkr level lookup for %s after %d attempts", discord_id, self.max_retries + 1)
+            return None
         level = payload.get("level")
         if not isinstance(level, int):
             log.error("Unexpected Lurkr response for %s: %s", discord_id, payload)
@@ -0,0 +1,212 @@
+"""Matchmaking queue that forms parties from players looking for a group."""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+import heapq
+import itertools
+import logging
+import math
+import time
+from typing import Callable
+
+from ..models import Player
+from .parties import PartyService
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class QueueEntry:
+    player: Player
+    band: int
+    class_key: int | None
+    enqueued_at: float
+    sequence: int
+    active: bool = True
+
+
+@dataclass(slots=True)
+class Match:
+    party_id: int
+    players: list[Player]
+    waits: list[float]
+
+
+@dataclass(slots=True)
+class _Bucket:
+    # Players of one level band, split by class so a match can spread across
+    # classes. Each deque is oldest first.
+    by_class: dict[int | None, deque[QueueEntry]] = field(default_factory=dict)
+    size: int = 0
+
+
+class MatchmakingService:
+    """Group queued players of similar level into parties.
+
+    Players are bucketed by ``lurkr_level // level_band`` and, inside a band,
+    by class. Each ``enqueue`` only looks at its own bucket. Once a bucket holds
+    ``party_size`` players, the match takes the oldest player of each class
+    first, using a heap over the class queue heads, and then fills the
+    remaining slots by age. The party and all its members are created in one
+    transaction by ``PartyService.create_party``.
+    """
+
+    def __init__(
+        self,
+        parties: PartyService,
+        *,
+        party_size: int = 4,
+        level_band: int = 10,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if party_size < 2:
+            raise ValueError("party_size must be at least 2")
+        if level_band < 1:
+            raise ValueError("level_band must be at least 1")
+        self.parties = parties
+        self.party_size = party_size
+        self.level_band = level_band
+        self._clock = clock
+        self._buckets: dict[int, _Bucket] = {}
+        self._entries: dict[int, QueueEntry] = {}
+        self._sequence = itertools.count()
+        self.parties_formed = 0
+        self.players_matched = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._recent_waits: deque[float] = deque(maxlen=1000)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, user_id: object) -> bool:
+        return user_id in self._entries
+
+    def band_of(self, player: Player) -> int:
+        return max(1, player.lurkr_level) // self.level_band
+
+    def band_range(self, band: int) -> tuple[int, int]:
+        return band * self.level_band, (band + 1) * self.level_band - 1
+
+    def queued_in_band(self, band: int) -> int:
+        bucket = self._buckets.get(band)
+        return bucket.size if bucket else 0
+
+    async def enqueue(self, player: Player) -> Match | None:
+        """Queue ``player`` and form a party if their band now has enough players.
+
+        Raises ``ValueError`` if the player is already queued or in a party.
+        """
+        if player.id in self._entries:
+            raise ValueError("You are already in the matchmaking queue.")
+        if self.parties.party_of(player.id) is not None:
+            raise ValueError("You are already in a party.")
+        entry = QueueEntry(
+            player=player,
+            band=self.band_of(player),
+            class_key=player.rpg_class.id if player.rpg_class else None,
+            enqueued_at=self._clock(),
+            sequence=next(self._sequence),
+        )
+        self._entries[player.id] = entry
+        bucket = self._buckets.setdefault(entry.band, _Bucket())
+        bucket.by_class.setdefault(entry.class_key, deque()).append(entry)
+        bucket.size += 1
+        if bucket.size < self.party_size:
+            return None
+        return await self._form_party(entry.band)
+
+    def dequeue(self, user_id: int) -> bool:
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return False
+        # Removing from the middle of a deque is linear, so mark the entry and
+        # let matching skip it.
+        entry.active = False
+        self._buckets[entry.band].size -= 1
+        return True
+
+    def _take(self, band: int) -> list[QueueEntry]:
+        bucket = self._buckets[band]
+        heads: list[tuple[int, int | None]] = []
+        for class_key, queue in bucket.by_class.items():
+            while queue and not queue[0].active:
+                queue.popleft()
+            if queue:
+                heads.append((queue[0].sequence, class_key))
+        heapq.heapify(heads)
+        picked: list[QueueEntry] = []
+        # First pass: the oldest player of each class, oldest class first.
+        while heads and len(picked) < self.party_size:
+            _, class_key = heapq.heappop(heads)
+            picked.append(bucket.by_class[class_key].popleft())
+        # Second pass: fill the remaining slots purely by age.
+        heads = []
+        for class_key, queue in bucket.by_class.items():
+            while queue and not queue[0].active:
+                queue.popleft()
+            if queue:
+                heads.append((queue[0].sequence, class_key))
+        heapq.heapify(heads)
+        while heads and len(picked) < self.party_size:
+            _, class_key = heapq.heappop(heads)
+            queue = bucket.by_class[class_key]
+            picked.append(queue.popleft())
+            while queue and not queue[0].active:
+                queue.popleft()
+            if queue:
+                heapq.heappush(heads, (queue[0].sequence, class_key))
+        for entry in picked:
+            entry.active = False
+            del self._entries[entry.player.id]
+        bucket.size -= len(picked)
+        for class_key in [key for key, queue in bucket.by_class.items() if not queue]:
+            del bucket.by_class[class_key]
+        if not bucket.size:
+            del self._buckets[band]
+        return picked
+
+    def _requeue(self, entries: list[QueueEntry]) -> None:
+        for entry in sorted(entries, key=lambda item: item.sequence, reverse=True):
+            entry.active = True
+            self._entries[entry.player.id] = entry
+            bucket = self._buckets.setdefault(entry.band, _Bucket())
+            bucket.by_class.setdefault(entry.class_key, deque()).appendleft(entry)
+            bucket.size += 1
+
+    async def _form_party(self, band: int) -> Match | None:
+        picked = self._take(band)
+        # Players may have joined a party by hand while they were queued.
+        free = [entry for entry in picked if self.parties.party_of(entry.player.id) is None]
+        if len(free) < self.party_size:
+            self._requeue(free)
+            return None
+        low, high = self.band_range(band)
+        leader, *members = (entry.player for entry in free)
+        try:
+            party_id = await self.parties.create_party(leader, f"Matched party (Lv {low}-{high})", members)
+        except ValueError:
+            log.warning("Matchmaking lost a race forming a party in band %d", band)
+            self._requeue([entry for entry in free if self.parties.party_of(entry.player.id) is None])
+            return None
+        now = self._clock()
+        waits = [now - entry.enqueued_at for entry in free]
+        self.parties_formed += 1
+        self.players_matched += len(free)
+        self.total_wait += sum(waits)
+        self.max_wait = max(self.max_wait, *waits)
+        self._recent_waits.extend(waits)
+        return Match(party_id=party_id, players=[entry.player for entry in free], waits=waits)
+
+    def stats(self) -> dict[str, float]:
+        recent = sorted(self._recent_waits)
+        return {
+            "queued": len(self._entries),
+            "bands": len(self._buckets),
+            "parties_formed": self.parties_formed,
+            "players_matched": self.players_matched,
+            "average_wait": self.total_wait / self.players_matched if self.players_matched else 0.0,
+            "p95_wait": recent[min(len(recent) - 1, math.ceil(0.95 * len(recent)) - 1)] if recent else 0.0,
+            "max_wait": self.max_wait,
+        }
@@ -1,47 +1,144 @@
 """Party management utilities."""
 from __future__ import annotations
 
+import sqlite3
+
 from ..database import Database
+from ..models import Player
 
 
 class PartyService:
+    """Parties plus an in-memory index of who belongs to which party.
+
+    ``load`` reads every membership once at startup; afterwards the service
+    is the only writer of ``party_members`` and patches the index once each
+    write commits, so membership lookups never touch the database. A unique
+    index on ``party_members(user_id)`` keeps each user in at most one party
+    even if two commands race.
+    """
+
     def __init__(self, db: Database):
         self.db = db
+        self._party_of: dict[int, int] = {}
+        # party_id -> {user_id: discord_id}, in join order.
+        self._members: dict[int, dict[int, int]] = {}
 
-    async def create_party(self, leader_user_id: int, name: str) -> int:
-        cursor = await self.db.execute(
-            "INSERT INTO parties (name, leader_user_id) VALUES (?, ?)",
-            name,
-            leader_user_id,
-        )
-        party_id = cursor.lastrowid
-        await self.db.execute(
-            "INSERT INTO party_members (party_id, user_id) VALUES (?, ?)",
-            party_id,
-            leader_user_id,
+    async def load(self) -> None:
+        rows = await self.db.fetch_all(
+            """
+            SELECT p.id AS party_id, pm.user_id, u.discord_id FROM parties p
+            LEFT JOIN party_members pm ON pm.party_id = p.id
+            LEFT JOIN users u ON u.id = pm.user_id
+            ORDER BY p.id, pm.rowid
+            """
         )
+        self._party_of.clear()
+        self._members.clear()
+        for row in rows:
+            members = self._members.setdefault(row["party_id"], {})
+            if row["user_id"] is not None:
+                members[row["user_id"]] = row["discord_id"]
+                self._party_of[row["user_id"]] = row["party_id"]
+
+    def exists(self, party_id: int) -> bool:
+        return party_id in self._members
+
+    def party_of(self, user_id: int) -> int | None:
+        return self._party_of.get(user_id)
+
+    def member_discord_ids(self, party_id: int) -> list[int]:
+        return list(self._members.get(party_id, {}).values())
+
+    async def create_party(self, leader: Player, name: str, members: list[Player] | None = None) -> int:
+        """Create a party led by ``leader``, optionally with other members.
+
+        Raises ``ValueError`` if any of them is already in a party.
+        """
+        players = [leader, *(member for member in members or [] if member.id != leader.id)]
+        if leader.id in self._party_of:
+            raise ValueError("You are already in a party.")
+        if any(player.id in self._party_of for player in players):
+            raise ValueError("A member is already in a party.")
+        try:
+            async with self.db.transaction():
+                cursor = await self.db.execute(
+                    "INSERT INTO parties (name, leader_user_id) VALUES (?, ?)",
+                    name,
+                    leader.id,
+                )
+                party_id = cursor.lastrowid
+                await self.db.executemany(
+                    "INSERT INTO party_members (party_id, user_id) VALUES (?, ?)",
+                    [(party_id, player.id) for player in players],
+                )
+                self.db.after_commit(lambda: self._index(party_id, players))
+        except sqlite3.IntegrityError as exc:
+            raise ValueError("A member is already in a party.") from exc
         return party_id
 
-    async def join_party(self, party_id: int, user_id: int) -> None:
-        await self.db.execute(
-            "INSERT OR IGNORE INTO party_members (party_id, user_id) VALUES (?, ?)",
-            party_id,
-            user_id,
-        )
+    async def join_party(self, party_id: int, player: Player) -> None:
+        if party_id not in self._members:
+            raise ValueError("Party not found.")
+        current = self._party_of.get(player.id)
+        if current == party_id:
+            return
+        if current is not None:
+            raise ValueError("You are already in a party.")
+        try:
+            async with self.db.transaction():
+                await self.db.execute(
+                    "INSERT INTO party_members (party_id, user_id) VALUES (?, ?)",
+                    party_id,
+                    player.id,
+                )
+                self.db.after_commit(lambda: self._index(party_id, [player]))
+        except sqlite3.IntegrityError as exc:
+            raise ValueError("You are already in a party.") from exc
 
-    async def leave_party(self, party_id: int, user_id: int) -> None:
-        await self.db.execute(
-            "DELETE FROM party_members WHERE party_id = ? AND user_id = ?",
-            party_id,
-            user_id,
-        )
+    async def leave_party(self, player: Player) -> tuple[int, bool]:
+        """Remove ``player`` from their party, disbanding it once empty.
+
+        Returns the party ID and whether the party was disbanded.
+        """
+        party_id = self._party_of.get(player.id)
+        if party_id is None:
+            raise ValueError("You are not in a party.")
+        async with self.db.transaction():
+            await self.db.execute(
+                "DELETE FROM party_members WHERE party_id = ? AND user_id = ?",
+                party_id,
+                player.id,
+            )
+            # Checked inside the transaction so two members leaving at once
+            # cannot both leave the party behind.
+            disband = not await self.db.fetch_one("SELECT 1 FROM party_members WHERE party_id = ? LIMIT 1", party_id)
+            if disband:
+                await self.db.execute("DELETE FROM parties WHERE id = ?", party_id)
+            self.db.after_commit(lambda: self._unindex(party_id, [player.id], disband=disband))
+        return party_id, disband
 
     async def list_members(self, party_id: int) -> list[int]:
-        rows = await self.db.fetch_all(
-            "SELECT user_id FROM party_members WHERE party_id = ?",
-            party_id,
-        )
-        return [row["user_id"] for row in rows]
+        return list(self._members.get(party_id, {}))
 
     async def disband_party(self, party_id: int) -> None:
-        await self.db.execute("DELETE FROM parties WHERE id = ?", party_id)
+        async with self.db.transaction():
+            await self.db.execute("DELETE FROM parties WHERE id = ?", party_id)
+            members = list(self._members.get(party_id, {}))
+            self.db.after_commit(lambda: self._unindex(party_id, members, disband=True))
+
+    def _index(self, party_id: int, players: list[Player]) -> None:
+        members = self._members.setdefault(party_id, {})
+        for player in players:
+            members[player.id] = player.discord_id
+            self._party_of[player.id] = party_id
+
+    def _unindex(self, party_id: int, user_ids: list[int], *, disband: bool) -> None:
+        members = self._members.get(party_id, {})
+        for user_id in user_ids:
+            members.pop(user_id, None)
+            if self._party_of.get(user_id) == party_id:
+                del self._party_of[user_id]
+        if disband:
+            for user_id in members:
+                self._party_of.pop(user_id, None)
+            self._members.pop(party_id, None)
@@ -1,145 +1,544 @@
 """Player service handling profile management and stat calculations."""
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Iterable, Sequence
 
+from ..cache import SingleFlight, TTLCache
 from ..database import Database
-from ..models import Item, Player, RPGClass, Skill, Trait
+from ..models import DEFAULT_EQUIP_LIMIT, EQUIP_LIMITS, InventoryEntry, Item, Player
+from ..rows import class_from_row, item_from_row, skill_from_row, trait_from_row
+from ..stats import CANONICAL_STATS, combat_power_column, compute_stats_matrix
+from .ledger import LedgerService
+from .lurkr import LurkrClient
 
 
-def _class_from_row(row: dict[str, Any]) -> RPGClass:
-    return RPGClass(
-        id=row["id"],
-        name=row["name"],
-        description=row.get("description", ""),
-        constitution_multiplier=row.get("constitution_multiplier", 1.0),
-        agility_multiplier=row.get("agility_multiplier", 1.0),
-        defense_multiplier=row.get("defense_multiplier", 1.0),
-        endurance_multiplier=row.get("endurance_multiplier", 1.0),
-        dantian_multiplier=row.get("dantian_multiplier", 1.0),
-        strength_multiplier=row.get("strength_multiplier", 1.0),
-        spirit_multiplier=row.get("spirit_multiplier", 1.0),
-    )
+log = logging.getLogger(__name__)
+
+# Upper bound on IDs bound into a single ``IN (...)`` query.
+_BATCH_SIZE = 500
+
+
+def _json_rows(raw: str | None) -> list[dict[str, Any]]:
+    return json.loads(raw) if raw else []
+
 
+# Loads a user together with their class, traits, equipped items, class skills
+# and currency balances in a single round trip. Collections are aggregated into
+# JSON so each user stays one result row.
+PLAYER_SELECT = """
+    SELECT
+        u.*,
+        CASE WHEN c.id IS NULL THEN NULL ELSE json_object(
+            'id', c.id,
+            'name', c.name,
+            'description', c.description,
+            'constitution_multiplier', c.constitution_multiplier,
+            'agility_multiplier', c.agility_multiplier,
+            'defense_multiplier', c.defense_multiplier,
+            'endurance_multiplier', c.endurance_multiplier,
+            'dantian_multiplier', c.dantian_multiplier,
+            'strength_multiplier', c.strength_multiplier,
+            'spirit_multiplier', c.spirit_multiplier
+        ) END AS class_json,
+        (
+            SELECT json_group_array(json_object(
+                'id', t.id,
+                'name', t.name,
+                'description', t.description,
+                'modifiers', json(t.modifiers)
+            ))
+            FROM user_traits ut
+            JOIN traits t ON t.id = ut.trait_id
+            WHERE ut.user_id = u.id
+        ) AS traits_json,
+        (
+            SELECT json_group_array(json_object(
+                'id', i.id,
+                'name', i.name,
+                'description', i.description,
+                'item_type', i.item_type,
+                'price', i.price,
+                'currency_id', i.currency_id,
+                'modifiers', json(i.modifiers)
+            ))
+            FROM inventory inv
+            JOIN items i ON i.id = inv.item_id
+            WHERE inv.user_id = u.id AND inv.equipped = 1
+        ) AS items_json,
+        (
+            SELECT json_group_array(json_object(
+                'id', s.id,
+                'name', s.name,
+                'description', s.description,
+                'grade', s.grade,
+                'skill_type', s.skill_type,
+                'cost', s.cost,
+                'damage_multiplier', s.damage_multiplier
+            ))
+            FROM class_skills cs
+            JOIN skills s ON s.id = cs.skill_id
+            WHERE cs.class_id = u.class_id
+        ) AS skills_json,
+        (
+            SELECT json_group_object(uc.currency_id, uc.amount)
+            FROM user_currencies uc
+            WHERE uc.user_id = u.id AND uc.amount != 0
+        ) AS wallet_json
+    FROM users u
+    LEFT JOIN classes c ON c.id = u.class_id
+"""
 
-def _skill_from_row(row: dict[str, Any]) -> Skill:
-    return Skill(
+
+_STATS_UPSERT = f"""
+    INSERT INTO user_stats (user_id, lurkr_level, {", ".join(CANONICAL_STATS)}, combat_power, updated_at)
+    VALUES ({", ".join(["?"] * (len(CANONICAL_STATS) + 4))})
+    ON CONFLICT(user_id) DO UPDATE SET
+        lurkr_level = excluded.lurkr_level,
+        {", ".join(f"{stat} = excluded.{stat}" for stat in CANONICAL_STATS)},
+        combat_power = excluded.combat_power,
+        updated_at = excluded.updated_at
+"""
+
+# Stats scale linearly with the Lurkr level, so a level change rescales the
+# stored row in place instead of rehydrating the player.
+_STATS_RESCALE = f"""
+    UPDATE user_stats SET
+        {", ".join(f"{stat} = {stat} * (MAX(1, ?1) * 1.0 / MAX(1, lurkr_level))" for stat in CANONICAL_STATS)},
+        combat_power = combat_power * (MAX(1, ?1) * 1.0 / MAX(1, lurkr_level)),
+        lurkr_level = ?1,
+        updated_at = ?2
+    WHERE user_id = ?3
+"""
+
+_GRANT_ITEM = """
+    INSERT INTO inventory (user_id, item_id, quantity) VALUES (?, ?, ?)
+    ON CONFLICT(user_id, item_id) DO UPDATE SET quantity = quantity + excluded.quantity
+"""
+
+
+def _player_from_row(row: dict[str, Any]) -> Player:
+    """Build a ``Player`` from a ``PLAYER_SELECT`` row or a bare ``users`` row."""
+    class_json = row.get("class_json")
+    return Player(
         id=row["id"],
-        name=row["name"],
-        description=row.get("description", ""),
-        grade=row.get("grade", "Tier 1"),
-        skill_type=row.get("skill_type", "physical"),
-        cost=row.get("cost", 0),
-        damage_multiplier=row.get("damage_multiplier", 1.0),
+        discord_id=row["discord_id"],
+        lurkr_level=row.get("lurkr_level", 1),
+        coins=row.get("coins", 0),
+        experience=row.get("experience", 0),
+        last_synced_at=row.get("last_synced_at"),
+        rpg_class=class_from_row(json.loads(class_json)) if class_json else None,
+        traits=[trait_from_row(item) for item in _json_rows(row.get("traits_json"))],
+        items=[item_from_row(item) for item in _json_rows(row.get("items_json"))],
+        skills=[skill_from_row(item) for item in _json_rows(row.get("skills_json"))],
+        wallet={
+            int(currency_id): amount
+            for currency_id, amount in json.loads(row.get("wallet_json") or "{}").items()
+        },
     )
-from .lurkr import LurkrClient
 
 
 class PlayerService:
-    def __init__(self, db: Database, lurkr_client: LurkrClient):
+    def __init__(
+        self,
+        db: Database,
+        lurkr_client: LurkrClient,
+        *,
+        cache_size: int = 1024,
+        cache_ttl: float = 60.0,
+        lurkr_sync_interval: float = 900.0,
+        ledger: LedgerService | None = None,
+    ):
         self.db = db
         self.lurkr = lurkr_client
+        self.ledger = ledger
+        self.lurkr_sync_interval = lurkr_sync_interval
+        self._sync_tasks: dict[int, asyncio.Task[None]] = {}
+        # discord_id -> when a background sync was last attempted, so members
+        # whose sync failed back off for ``lurkr_sync_interval`` too.
+        self._sync_attempts: dict[int, float] = {}
+        # Hydrated players keyed by Discord ID. Service methods that change a
+        # player write the updated object back, or drop it when the in-memory
+        # copy cannot be patched.
+        self.cache: TTLCache[int, Player] = TTLCache(cache_size, cache_ttl)
+        # Concurrent cache misses for one user share a single hydration.
+        self._loads: SingleFlight[int, Player] = SingleFlight()
 
     async def ensure_player(self, discord_id: int) -> Player:
-        record = await self.db.fetch_one("SELECT * FROM users WHERE discord_id = ?", discord_id)
+        player = self.cache.get(discord_id)
+        if player is None:
+            player = await self._loads.do(discord_id, lambda: self._load_player(discord_id))
+        if self._needs_sync(player):
+            self._schedule_sync([player])
+        return player
+
+    async def ensure_players(self, discord_ids: Sequence[int]) -> list[Player]:
+        """Hydrate several players at once, in the order of ``discord_ids``.
+
+        Cache misses are loaded together with set-based queries, and stale
+        Lurkr levels are refreshed concurrently in one background task.
+        """
+        players: dict[int, Player] = {}
+        missing: list[int] = []
+        for discord_id in dict.fromkeys(discord_ids):
+            cached = self.cache.get(discord_id)
+            if cached is None:
+                missing.append(discord_id)
+            else:
+                players[discord_id] = cached
+        if missing:
+            players.update(await self._loads.do_many(missing, self._load_players))
+        stale = [player for player in players.values() if self._needs_sync(player)]
+        if stale:
+            self._schedule_sync(stale)
+        return [players[discord_id] for discord_id in discord_ids]
+
+    def _needs_sync(self, player: Player) -> bool:
+        if not self.lurkr.configured:
+            return False
+        last = max(player.last_synced_at or 0.0, self._sync_attempts.get(player.discord_id, 0.0))
+        return time.time() - last >= self.lurkr_sync_interval
+
+    def _schedule_sync(self, players: list[Player]) -> None:
+        """Refresh Lurkr levels without blocking the calling command."""
+        pending = [player for player in players if player.discord_id not in self._sync_tasks]
+        if not pending:
+            return
+        now = time.time()
+        if len(self._sync_attempts) > max(self.cache.maxsize, _BATCH_SIZE):
+            cutoff = now - self.lurkr_sync_interval
+            self._sync_attempts = {
+                discord_id: attempted for discord_id, attempted in self._sync_attempts.items() if attempted > cutoff
+            }
+        for player in pending:
+            self._sync_attempts[player.discord_id] = now
+        task = asyncio.create_task(self._background_sync(pending))
+        for player in pending:
+            self._sync_tasks[player.discord_id] = task
+        task.add_done_callback(lambda done: self._finish_sync(pending, done))
+
+    def _finish_sync(self, players: list[Player], task: asyncio.Task[None]) -> None:
+        for player in players:
+            if self._sync_tasks.get(player.discord_id) is task:
+                del self._sync_tasks[player.discord_id]
+
+    async def _background_sync(self, players: list[Player]) -> None:
+        try:
+            if len(players) == 1:
+                await self.sync_lurkr_level(players[0])
+                return
+            levels = await self._store_levels([(player.id, player.discord_id) for player in players])
+            synced_at = time.time()
+            for player in players:
+                if player.discord_id in levels:
+                    player.lurkr_level = levels[player.discord_id]
+                    player.last_synced_at = synced_at
+        except Exception:  # noqa: BLE001
+            log.exception("Background Lurkr sync failed for %s", [player.discord_id for player in players])
+
+    async def close(self) -> None:
+        tasks = list(self._sync_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _load_player(self, discord_id: int) -> Player:
+        record = await self.db.fetch_one(f"{PLAYER_SELECT} WHERE u.discord_id = ?", discord_id)
+        created = False
         if record is None:
-            await self.db.execute("INSERT INTO users (discord_id) VALUES (?)", discord_id)
-            record = await self.db.fetch_one("SELECT * FROM users WHERE discord_id = ?", discord_id)
-        player = await self._hydrate_player(record)
-        await self.sync_lurkr_level(player)
+            record = await self.db.execute_fetch_one(
+                "INSERT INTO users (discord_id) VALUES (?) ON CONFLICT(discord_id) DO NOTHING RETURNING *",
+                discord_id,
+            )
+            created = record is not None
+        if record is None:
+            # Another command registered this user between our read and insert.
+            record = await self.db.fetch_one(f"{PLAYER_SELECT} WHERE u.discord_id = ?", discord_id)
+        player = _player_from_row(record)
+        if created:
+            await self._store_stats([player])
+        self.cache.put(discord_id, player)
         return player
 
+    async def _load_players(self, discord_ids: list[int]) -> dict[int, Player]:
+        players: dict[int, Player] = {}
+        for start in range(0, len(discord_ids), _BATCH_SIZE):
+            chunk = discord_ids[start : start + _BATCH_SIZE]
+            placeholders = ", ".join(["?"] * len(chunk))
+            rows = await self.db.fetch_all(f"{PLAYER_SELECT} WHERE u.discord_id IN ({placeholders})", *chunk)
+            new_ids = sorted(set(chunk) - {row["discord_id"] for row in rows})
+            if new_ids:
+                created = await self.db.execute_fetch_all(
+                    f"""
+                    INSERT INTO users (discord_id) VALUES {", ".join(["(?)"] * len(new_ids))}
+                    ON CONFLICT(discord_id) DO NOTHING RETURNING *
+                    """,
+                    *new_ids,
+                )
+                await self._store_stats([_player_from_row(row) for row in created])
+                rows += created
+                raced = sorted(set(new_ids) - {row["discord_id"] for row in rows})
+                if raced:
+                    # Registered by another command between our read and insert.
+                    rows += await self.db.fetch_all(
+                        f"{PLAYER_SELECT} WHERE u.discord_id IN ({', '.join(['?'] * len(raced))})",
+                        *raced,
+                    )
+            for row in rows:
+                player = _player_from_row(row)
+                self.cache.put(player.discord_id, player)
+                players[player.discord_id] = player
+        return players
+
     async def sync_lurkr_level(self, player: Player) -> None:
+        """Fetch the player's Lurkr level now and record when it was synced."""
         level = await self.lurkr.fetch_level(player.discord_id)
-        if level is None or level == player.lurkr_level:
+        if level is None:
             return
         player.lurkr_level = level
+        player.last_synced_at = time.time()
         await self.db.execute(
-            "UPDATE users SET lurkr_level = ? WHERE id = ?",
+            "UPDATE users SET lurkr_level = ?, last_synced_at = ? WHERE id = ?",
             level,
+            player.last_synced_at,
             player.id,
         )
+        self.cache.put(player.discord_id, player)
+        await self.refresh_stats(player)
 
-    async def _hydrate_player(self, record: dict[str, Any]) -> Player:
-        rpg_class = None
-        if record.get("class_id"):
-            class_row = await self.db.fetch_one("SELECT * FROM classes WHERE id = ?", record["class_id"])
-            if class_row:
-                rpg_class = _class_from_row(class_row)
-        traits = [
-            Trait(
-                id=row["id"],
-                name=row["name"],
-                description=row.get("description", ""),
-                modifiers=self.db.deserialize_payload(row.get("modifiers")),
-            )
-            for row in await self.db.fetch_all(
-                """
-                SELECT t.* FROM traits t
-                JOIN user_traits ut ON ut.trait_id = t.id
-                WHERE ut.user_id = ?
-                """,
-                record["id"],
-            )
-        ]
-        items = [
-            Item(
-                id=row["id"],
-                name=row["name"],
-                description=row.get("description", ""),
-                item_type=row["item_type"],
-                price=row["price"],
-                modifiers=self.db.deserialize_payload(row.get("modifiers")),
+    async def sync_all_levels(self, chunk_size: int = 200) -> int:
+        """Refresh ``lurkr_level`` for every registered user and return how many were synced.
+
+        Users are walked in primary-key order one chunk at a time. Each chunk
+        is fetched concurrently through the Lurkr client and written back with
+        a single ``executemany``. The job stops early while Lurkr's circuit
+        breaker is open.
+        """
+        if not self.lurkr.configured:
+            log.warning("Lurkr API configuration missing; skipping bulk level sync")
+            return 0
+        last_id = 0
+        synced = 0
+        while self.lurkr.available:
+            rows = await self.db.fetch_all(
+                "SELECT id, discord_id FROM users WHERE id > ? ORDER BY id LIMIT ?",
+                last_id,
+                chunk_size,
             )
-            for row in await self.db.fetch_all(
-                """
-                SELECT i.* FROM items i
-                JOIN inventory inv ON inv.item_id = i.id
-                WHERE inv.user_id = ?
-                """,
-                record["id"],
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+            levels = await self._store_levels([(row["id"], row["discord_id"]) for row in rows])
+            synced += len(levels)
+        return synced
+
+    async def _store_levels(self, members: list[tuple[int, int]]) -> dict[int, int]:
+        """Fetch levels for ``(user_id, discord_id)`` pairs concurrently and persist them."""
+        levels = await self.lurkr.fetch_levels(discord_id for _, discord_id in members)
+        if not levels:
+            return levels
+        synced_at = time.time()
+        await self.db.executemany(
+            "UPDATE users SET lurkr_level = ?, last_synced_at = ? WHERE id = ?",
+            [
+                (levels[discord_id], synced_at, user_id)
+                for user_id, discord_id in members
+                if discord_id in levels
+            ],
+        )
+        await self.db.executemany(
+            _STATS_RESCALE,
+            [
+                (levels[discord_id], synced_at, user_id)
+                for user_id, discord_id in members
+                if discord_id in levels
+            ],
+        )
+        for discord_id, level in levels.items():
+            cached = self.cache.peek(discord_id)
+            if cached is not None:
+                cached.lurkr_level = level
+                cached.last_synced_at = synced_at
+        return levels
+
+    @staticmethod
+    def compute_stats(players: Sequence[Player]) -> Any:
+        """Compute canonical stats for many players at once.
+
+        Returns an ``N x 7`` NumPy array in ``CANONICAL_STATS`` column order, or
+        a list of rows when NumPy is not installed.
+        """
+        return compute_stats_matrix(players)
+
+    async def refresh_stats(self, player: Player) -> None:
+        """Write the player's current stats to the ``user_stats`` table."""
+        await self._store_stats([player])
+
+    async def _store_stats(self, players: Sequence[Player]) -> None:
+        if not players:
+            return
+        matrix = compute_stats_matrix(players)
+        powers = combat_power_column(matrix)
+        updated_at = time.time()
+        await self.db.executemany(
+            _STATS_UPSERT,
+            [
+                (player.id, player.lurkr_level, *map(float, row), float(power), updated_at)
+                for player, row, power in zip(players, matrix, powers)
+            ],
+        )
+
+    async def rebuild_stats(self, user_ids: Iterable[int]) -> int:
+        """Rehydrate the given users, rewrite their ``user_stats`` rows and return the count.
+
+        Cached copies of these players are replaced with the fresh ones.
+        """
+        ids = list(dict.fromkeys(user_ids))
+        rebuilt = 0
+        for start in range(0, len(ids), _BATCH_SIZE):
+            chunk = ids[start : start + _BATCH_SIZE]
+            rows = await self.db.fetch_all(
+                f"{PLAYER_SELECT} WHERE u.id IN ({', '.join(['?'] * len(chunk))})",
+                *chunk,
             )
-        ]
-        skills = [
-            _skill_from_row(row)
-            for row in await self.db.fetch_all(
-                """
-                SELECT s.* FROM skills s
-                JOIN class_skills cs ON cs.skill_id = s.id
-                WHERE cs.class_id = ?
-                """,
-                record.get("class_id"),
+            players = [_player_from_row(row) for row in rows]
+            await self._store_stats(players)
+            for player in players:
+                if self.cache.peek(player.discord_id) is not None:
+                    self.cache.put(player.discord_id, player)
+            rebuilt += len(players)
+        return rebuilt
+
+    async def refresh_stats_for_content(
+        self,
+        *,
+        class_id: int | None = None,
+        trait_id: int | None = None,
+        item_id: int | None = None,
+    ) -> int:
+        """Rebuild stats for every user holding a class, trait or item whose modifiers changed."""
+        if class_id is not None:
+            rows = await self.db.fetch_all("SELECT id FROM users WHERE class_id = ?", class_id)
+        elif trait_id is not None:
+            rows = await self.db.fetch_all("SELECT user_id AS id FROM user_traits WHERE trait_id = ?", trait_id)
+        elif item_id is not None:
+            rows = await self.db.fetch_all(
+                "SELECT user_id AS id FROM inventory WHERE item_id = ? AND equipped = 1",
+                item_id,
             )
-        ] if record.get("class_id") else []
-        return Player(
-            id=record["id"],
-            discord_id=record["discord_id"],
-            lurkr_level=record.get("lurkr_level", 1),
-            coins=record.get("coins", 0),
-            experience=record.get("experience", 0),
-            rpg_class=rpg_class,
-            traits=traits,
-            items=items,
-            skills=skills,
+        else:
+            raise ValueError("One of class_id, trait_id or item_id is required")
+        return await self.rebuild_stats(row["id"] for row in rows)
+
+    async def backfill_stats(self) -> int:
+        """Create ``user_stats`` rows for users that predate the table."""
+        rows = await self.db.fetch_all(
+            """
+            SELECT u.id FROM users u
+            LEFT JOIN user_stats s ON s.user_id = u.id
+            WHERE s.user_id IS NULL
+            """
         )
+        return await self.rebuild_stats(row["id"] for row in rows)
 
-    async def add_coins(self, player: Player, amount: int) -> None:
-        player.coins += amount
-        await self.db.execute("UPDATE users SET coins = ? WHERE id = ?", player.coins, player.id)
+    async def leaderboard(self, limit: int = 10) -> list[dict[str, Any]]:
+        """Return the strongest players by stored combat power."""
+        return await self.db.fetch_all(
+            """
+            SELECT u.discord_id, s.lurkr_level, s.combat_power
+            FROM user_stats s
+            JOIN users u ON u.id = s.user_id
+            ORDER BY s.combat_power DESC
+            LIMIT ?
+            """,
+            limit,
+        )
+
+    def _cache_on_commit(self, player: Player) -> None:
+        """Drop the cached copy now and store ``player`` once the change commits.
+
+        ``player`` already carries the uncommitted change, so it must not be
+        served from the cache before then; after a rollback the entry simply
+        stays evicted and the next lookup reloads it.
+        """
+        self.cache.invalidate(player.discord_id)
+        self.db.after_commit(lambda: self.cache.put(player.discord_id, player))
+
+    def _set_coins_on_commit(self, balances: list[tuple[Player, int]]) -> None:
+        # Like ledger entries, in-memory balances only change once the update
+        # commits, so a rollback cannot leave phantom coins in the cache.
+        def apply() -> None:
+            for player, coins in balances:
+                player.coins = coins
+                self.cache.put(player.discord_id, player)
+
+        self.db.after_commit(apply)
 
-    async def spend_coins(self, player: Player, amount: int) -> bool:
-        if player.coins < amount:
+    def _record_coins(self, changes: list[tuple[int, int]], reason: str) -> None:
+        # Ledger entries are only buffered once the balance change commits.
+        if self.ledger is not None and changes:
+            ledger = self.ledger
+            self.db.after_commit(lambda: ledger.record_many(changes, reason))
+
+    async def add_coins(self, player: Player, amount: int, *, reason: str) -> None:
+        # Apply the delta in SQL so concurrent rewards and purchases cannot
+        # overwrite each other, and refresh the cached balance from the row.
+        row = await self.db.execute_fetch_one(
+            "UPDATE users SET coins = coins + ? WHERE id = ? RETURNING coins",
+            amount,
+            player.id,
+        )
+        if row:
+            self._set_coins_on_commit([(player, row["coins"])])
+            self._record_coins([(player.id, amount)], reason)
+
+    async def spend_coins(self, player: Player, amount: int, *, reason: str) -> bool:
+        """Deduct ``amount`` only if the stored balance covers it."""
+        row = await self.db.execute_fetch_one(
+            "UPDATE users SET coins = coins - ?1 WHERE id = ?2 AND coins >= ?1 RETURNING coins",
+            amount,
+            player.id,
+        )
+        if not row:
             return False
-        await self.add_coins(player, -amount)
+        self._set_coins_on_commit([(player, row["coins"])])
+        self._record_coins([(player.id, -amount)], reason)
         return True
 
+    async def add_coins_bulk(self, credits: Sequence[tuple[Player, int]], *, reason: str) -> None:
+        """Credit many players with one ``UPDATE`` per batch of users."""
+        totals: dict[int, int] = {}
+        players: dict[int, list[Player]] = {}
+        for player, amount in credits:
+            if amount:
+                totals[player.id] = totals.get(player.id, 0) + amount
+                players.setdefault(player.id, []).append(player)
+        user_ids = list(totals)
+        for start in range(0, len(user_ids), _BATCH_SIZE):
+            chunk = user_ids[start : start + _BATCH_SIZE]
+            rows = await self.db.execute_fetch_all(
+                f"""
+                WITH credits(id, amount) AS (VALUES {", ".join(["(?, ?)"] * len(chunk))})
+                UPDATE users SET coins = coins + credits.amount
+                FROM credits
+                WHERE users.id = credits.id
+                RETURNING users.id, users.coins
+                """,
+                *(value for user_id in chunk for value in (user_id, totals[user_id])),
+            )
+            self._set_coins_on_commit([(player, row["coins"]) for row in rows for player in players[row["id"]]])
+            self._record_coins([(row["id"], totals[row["id"]]) for row in rows], reason)
+
     async def assign_class(self, player: Player, class_id: int) -> None:
         await self.db.execute("UPDATE users SET class_id = ? WHERE id = ?", class_id, player.id)
         class_row = await self.db.fetch_one("SELECT * FROM classes WHERE id = ?", class_id)
         if class_row:
-            player.rpg_class = _class_from_row(class_row)
+            player.rpg_class = class_from_row(class_row)
         player.skills = [
-            _skill_from_row(row)
+            skill_from_row(row)
             for row in await self.db.fetch_all(
                 """
                 SELECT s.* FROM skills s
@@ -149,45 +548,98 @@ async def assign_class(self, player: Player, class_id: int) -> None:
                 class_id,
             )
         ]
+        self._cache_on_commit(player)
+        await self.refresh_stats(player)
 
-    async def grant_item(self, player: Player, item_id: int, quantity: int = 1) -> None:
-        existing = await self.db.fetch_one(
-            "SELECT quantity FROM inventory WHERE user_id = ? AND item_id = ?",
+    async def grant_trait(self, player: Player, trait_id: int) -> bool:
+        """Give the player a trait; returns ``False`` if they already had it."""
+        cursor = await self.db.execute(
+            "INSERT OR IGNORE INTO user_traits (user_id, trait_id) VALUES (?, ?)",
             player.id,
-            item_id,
+            trait_id,
         )
-        if existing:
-            await self.db.execute(
-                "UPDATE inventory SET quantity = quantity + ? WHERE user_id = ? AND item_id = ?",
-                quantity,
+        if not cursor.rowcount:
+            return False
+        trait_row = await self.db.fetch_one("SELECT * FROM traits WHERE id = ?", trait_id)
+        if trait_row:
+            player.traits.append(trait_from_row(trait_row))
+        self._cache_on_commit(player)
+        await self.refresh_stats(player)
+        return True
+
+    async def grant_item(self, player: Player, item_id: int, quantity: int = 1) -> None:
+        await self.db.execute(_GRANT_ITEM, player.id, item_id, quantity)
+
+    async def grant_items_bulk(self, grants: Sequence[tuple[int, int, int]]) -> None:
+        """Add ``(user_id, item_id, quantity)`` grants in one transaction."""
+        if not grants:
+            return
+        async with self.db.transaction():
+            await self.db.executemany(_GRANT_ITEM, grants)
+
+    async def equip_item(self, player: Player, item_id: int) -> Item:
+        """Equip an owned item, respecting the per-``item_type`` limit."""
+        async with self.db.transaction():
+            row = await self.db.fetch_one(
+                """
+                SELECT i.*, inv.equipped FROM inventory inv
+                JOIN items i ON i.id = inv.item_id
+                WHERE inv.user_id = ? AND inv.item_id = ? AND inv.quantity > 0
+                """,
                 player.id,
                 item_id,
             )
-        else:
+            if not row:
+                raise ValueError("You do not own that item.")
+            if row["equipped"]:
+                raise ValueError("That item is already equipped.")
+            item = item_from_row(row)
+            limit = EQUIP_LIMITS.get(item.item_type.lower(), DEFAULT_EQUIP_LIMIT)
+            equipped = await self.db.fetch_one(
+                """
+                SELECT COUNT(*) AS total FROM inventory inv
+                JOIN items i ON i.id = inv.item_id
+                WHERE inv.user_id = ? AND inv.equipped = 1 AND lower(i.item_type) = ?
+                """,
+                player.id,
+                item.item_type.lower(),
+            )
+            if equipped["total"] >= limit:
+                raise ValueError(f"You can equip at most {limit} {item.item_type} item(s) at once.")
             await self.db.execute(
-                "INSERT INTO inventory (user_id, item_id, quantity) VALUES (?, ?, ?)",
+                "UPDATE inventory SET equipped = 1 WHERE user_id = ? AND item_id = ?",
+                player.id,
+                item_id,
+            )
+            player.items.append(item)
+            self._cache_on_commit(player)
+            await self.refresh_stats(player)
+        return item
+
+    async def unequip_item(self, player: Player, item_id: int) -> None:
+        async with self.db.transaction():
+            cursor = await self.db.execute(
+                "UPDATE inventory SET equipped = 0 WHERE user_id = ? AND item_id = ? AND equipped = 1",
                 player.id,
                 item_id,
-                quantity,
             )
+            if not cursor.rowcount:
+                raise ValueError("That item is not equipped.")
+            player.items = [item for item in player.items if item.id != item_id]
+            self._cache_on_commit(player)
+            await self.refresh_stats(player)
 
-    async def list_inventory(self, player: Player) -> list[Item]:
-        items = await self.db.fetch_all(
+    async def list_inventory(self, player: Player) -> list[InventoryEntry]:
+        rows = await self.db.fetch_all(
             """
-            SELECT i.* FROM items i
+            SELECT i.*, inv.quantity, inv.equipped FROM items i
             JOIN inventory inv ON inv.item_id = i.id
             WHERE inv.user_id = ?
+            ORDER BY inv.equipped DESC, i.item_type, i.name
             """,
             player.id,
         )
         return [
-            Item(
-                id=row["id"],
-                name=row["name"],
-                description=row.get("description", ""),
-                item_type=row["item_type"],
-                price=row["price"],
-                modifiers=self.db.deserialize_payload(row.get("modifiers")),
-            )
-            for row in items
+            InventoryEntry(item=item_from_row(row), quantity=row["quantity"], equipped=bool(row["equipped"]))
+            for row in rows
         ]
@@ -0,0 +1,141 @@
+"""Monte Carlo estimates of how often parties beat an enemy."""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import random
+from typing import Mapping, Sequence
+
+from ..models import Enemy, RPGClass, Skill
+from ..stats import IDENTITY, StatBlock
+from .engine import BatchParty, Combatant, resolve_batch, resolve_fight
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+DEFAULT_PARTY_SIZES = (1, 2, 3, 4)
+DEFAULT_LEVEL_FACTORS = (0.5, 0.75, 1.0, 1.25, 1.5)
+
+
+@dataclass(frozen=True, slots=True)
+class SimulationCell:
+    party_size: int
+    level: int
+    # Class name, "Unassigned", or "Mixed" for parties drawn from every class.
+    class_name: str
+    win_rate: float
+    trials: int
+
+
+def default_levels(enemy: Enemy) -> list[int]:
+    """Lurkr levels around the enemy's own level."""
+    return sorted({max(1, round(enemy.level * factor)) for factor in DEFAULT_LEVEL_FACTORS})
+
+
+def _class_profile(rpg_class: RPGClass | None, skills: Sequence[Skill]) -> Combatant:
+    # Stats scale linearly with level, and so do every pool and damage figure
+    # derived from them, so a member is their class's level 1 profile times
+    # their level. Only skill costs stay fixed.
+    compiled = rpg_class.compiled if rpg_class else IDENTITY
+    return Combatant.from_stats(StatBlock(compiled.vector), skills)
+
+
+def _at_level(profile: Combatant, level: int) -> Combatant:
+    return Combatant(
+        max_hp=profile.max_hp * level,
+        max_stamina=profile.max_stamina * level,
+        max_qi=profile.max_qi * level,
+        defense=profile.defense * level,
+        agility=profile.agility * level,
+        attack=profile.attack * level,
+        skills=tuple((damage * level, cost, resource) for damage, cost, resource in profile.skills),
+        skill_ids=profile.skill_ids,
+        skill_names=profile.skill_names,
+    )
+
+
+def simulate_enemy(
+    enemy: Enemy,
+    classes: Sequence[RPGClass | None] = (None,),
+    *,
+    skills: Mapping[int, Sequence[Skill]] | None = None,
+    party_sizes: Sequence[int] = DEFAULT_PARTY_SIZES,
+    levels: Sequence[int] | None = None,
+    trials: int = 10_000,
+    level_spread: int = 0,
+    mixed: bool = False,
+    seed: int | None = None,
+) -> list[SimulationCell]:
+    """Estimate win rates against ``enemy`` over a grid of party setups.
+
+    Each cell plays ``trials`` fights under the turn-based rules of
+    ``CombatService.battle``. Member levels are drawn uniformly from
+    ``level +/- level_spread``, and members use their class skills from
+    ``skills`` (keyed by class ID). Each class gets its own cells with every
+    member of that class; with ``mixed`` the grid has a single "Mixed" class
+    whose members draw their class uniformly from ``classes``. Traits and items
+    are not modelled.
+
+    The work is pure CPU and, with NumPy installed, vectorized over all trials
+    of a cell. Call it through ``asyncio.to_thread`` (see ``simulate_enemy_async``)
+    from the event loop.
+    """
+    if trials < 1:
+        raise ValueError("trials must be at least 1")
+    if not classes:
+        raise ValueError("at least one class is required")
+    skills = skills or {}
+    levels = list(levels) if levels else default_levels(enemy)
+    foes = {size: Combatant.for_enemy(enemy, size) for size in party_sizes}
+    profiles = [
+        _class_profile(rpg_class, skills.get(rpg_class.id, ()) if rpg_class else ()) for rpg_class in classes
+    ]
+    names = [rpg_class.name if rpg_class else "Unassigned" for rpg_class in classes]
+    groups: list[tuple[str, list[Combatant]]] = (
+        [("Mixed", profiles)] if mixed else [(name, [profile]) for name, profile in zip(names, profiles)]
+    )
+    cells: list[SimulationCell] = []
+    if np is not None:
+        rng = np.random.default_rng(seed)
+        for class_name, group in groups:
+            for size in party_sizes:
+                for level in levels:
+                    member_levels = rng.integers(
+                        max(1, level - level_spread), level + level_spread + 1, size=(trials, size)
+                    ).astype(float)
+                    member_classes = rng.integers(0, len(group), size=(trials, size))
+                    won = resolve_batch(BatchParty.from_profiles(group, member_classes, member_levels), foes[size], rng)
+                    wins = int(np.count_nonzero(won))
+                    cells.append(SimulationCell(size, level, class_name, wins / trials, trials))
+        return cells
+
+    rng_py = random.Random(seed)
+    for class_name, group in groups:
+        scaled: dict[tuple[int, int], Combatant] = {}
+        for size in party_sizes:
+            for level in levels:
+                low, high = max(1, level - level_spread), level + level_spread
+                wins = 0
+                for _ in range(trials):
+                    party = []
+                    for _ in range(size):
+                        key = (rng_py.randrange(len(group)), rng_py.randint(low, high))
+                        member = scaled.get(key)
+                        if member is None:
+                            member = scaled[key] = _at_level(group[key[0]], key[1])
+                        party.append(member)
+                    if resolve_fight(party, foes[size], rng_py).won:
+                        wins += 1
+                cells.append(SimulationCell(size, level, class_name, wins / trials, trials))
+    return cells
+
+
+async def simulate_enemy_async(
+    enemy: Enemy,
+    classes: Sequence[RPGClass | None] = (None,),
+    **options: object,
+) -> list[SimulationCell]:
+    """Run ``simulate_enemy`` in a worker thread so the event loop stays responsive."""
+    return await asyncio.to_thread(simulate_enemy, enemy, classes, **options)  # type: ignore[arg-type]
@@ -3,6 +3,7 @@
 
 from ..database import Database
 from ..models import Item
+from ..rows import item_from_row
 
 
 class StoreService:
@@ -11,27 +12,8 @@ def __init__(self, db: Database):
 
     async def list_items(self) -> list[Item]:
         rows = await self.db.fetch_all("SELECT * FROM items ORDER BY price ASC")
-        return [
-            Item(
-                id=row["id"],
-                name=row["name"],
-                description=row.get("description", ""),
-                item_type=row["item_type"],
-                price=row["price"],
-                modifiers=self.db.deserialize_payload(row.get("modifiers")),
-            )
-            for row in rows
-        ]
+        return [item_from_row(row) for row in rows]
 
     async def get_item(self, item_id: int) -> Item | None:
         row = await self.db.fetch_one("SELECT * FROM items WHERE id = ?", item_id)
-        if not row:
-            return None
-        return Item(
-            id=row["id"],
-            name=row["name"],
-            description=row.get("description", ""),
-            item_type=row["item_type"],
-            price=row["price"],
-            modifiers=self.db.deserialize_payload(row.get("modifiers")),
-        )
+        return item_from_row(row) if row else None
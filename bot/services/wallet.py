@@ -0,0 +1,234 @@
+"""Multi-currency balances built on ``users.coins`` and ``user_currencies``."""
+from __future__ import annotations
+
+from typing import Any, Iterable, Mapping, Sequence
+
+from ..database import Database
+from ..models import Player
+from .ledger import COINS, LedgerService
+from .players import PlayerService
+
+# Multi-row upserts are chunked to stay well under SQLite's variable limit.
+_BATCH_SIZE = 300
+
+
+class InsufficientFunds(Exception):
+    """Raised inside a debit to roll back every balance it already touched."""
+
+
+class InvalidReward(ValueError):
+    """A reward payload names an unknown currency or a malformed amount."""
+
+
+def _reward_amount(value: Any, label: str) -> int:
+    try:
+        amount = int(value or 0)
+    except (TypeError, ValueError):
+        raise InvalidReward(f"Reward amount for {label} must be a whole number, not {value!r}.") from None
+    if amount < 0:
+        raise InvalidReward(f"Reward amount for {label} cannot be negative.")
+    return amount
+
+
+def reward_currencies(rewards: Mapping[str, Any]) -> dict[int, int]:
+    """Extract ``{currency_id: amount}`` from a quest or enemy reward payload.
+
+    Payloads keep ``"coins"`` for the base currency and may add
+    ``"currencies": {"<currency_id>": amount}`` for any other currency.
+    Raises ``InvalidReward`` for IDs or amounts that are not whole numbers;
+    ``check_rewards`` also checks that every ID exists.
+    """
+    amounts: dict[int, int] = {}
+    coins = _reward_amount(rewards.get("coins", 0), "coins")
+    if coins:
+        amounts[COINS] = coins
+    currencies = rewards.get("currencies") or {}
+    if not isinstance(currencies, Mapping):
+        raise InvalidReward('Reward "currencies" must map currency IDs to amounts.')
+    for key, value in currencies.items():
+        try:
+            currency_id = int(key)
+        except (TypeError, ValueError):
+            raise InvalidReward(f"Reward currency ID {key!r} is not a number.") from None
+        amount = _reward_amount(value, f"currency {currency_id}")
+        if amount:
+            amounts[currency_id] = amounts.get(currency_id, 0) + amount
+    return amounts
+
+
+def reward_items(rewards: Mapping[str, Any]) -> list[int]:
+    """Extract the item IDs a reward payload grants through ``"items": [...]``."""
+    items = rewards.get("items") or []
+    if not isinstance(items, list):
+        raise InvalidReward('Reward "items" must be a list of item IDs.')
+    try:
+        return [int(item_id) for item_id in items]
+    except (TypeError, ValueError):
+        raise InvalidReward('Reward "items" must be a list of item IDs.') from None
+
+
+async def _check_ids(db: Database, table: str, label: str, ids: set[int]) -> None:
+    if not ids:
+        return
+    rows = await db.fetch_all(f"SELECT id FROM {table} WHERE id IN ({', '.join('?' * len(ids))})", *ids)
+    missing = sorted(ids - {row["id"] for row in rows})
+    if missing:
+        raise InvalidReward(f"Unknown {label} ID{'s' if len(missing) > 1 else ''}: {', '.join(map(str, missing))}.")
+
+
+async def check_currencies(db: Database, currency_ids: Iterable[int]) -> None:
+    """Raise ``InvalidReward`` unless every non-coin ID is a row in ``currencies``."""
+    wanted = {currency_id for currency_id in currency_ids if currency_id != COINS}
+    await _check_ids(db, "currencies", "currency", wanted)
+
+
+async def check_rewards(db: Database, rewards: Mapping[str, Any]) -> tuple[dict[int, int], list[int]]:
+    """Parse a reward payload into currency amounts and item IDs that all exist.
+
+    Raises ``InvalidReward`` for anything the payout would trip over, so
+    callers can check before opening the transaction that pays it.
+    """
+    amounts = reward_currencies(rewards)
+    items = reward_items(rewards)
+    await check_currencies(db, amounts)
+    await _check_ids(db, "items", "item", set(items))
+    return amounts, items
+
+
+def format_amounts(amounts: Mapping[int, int], names: Mapping[int, str]) -> str:
+    """Render ``{currency_id: amount}`` as ``"50 coins, 3 Jade"``."""
+    parts = [
+        f"{amount} {'coins' if currency_id == COINS else names.get(currency_id, f'currency {currency_id}')}"
+        for currency_id, amount in amounts.items()
+    ]
+    return ", ".join(parts) or "nothing"
+
+
+class WalletService:
+    """Credit and debit any mix of currencies in one transaction.
+
+    Amounts are ``{currency_id: amount}`` mappings where ``COINS`` (``0``)
+    is ``users.coins`` and every other ID is a row in ``currencies``. Balances
+    other than coins live in ``user_currencies`` and are mirrored on
+    ``Player.wallet``, which hydration loads alongside the rest of the player.
+    """
+
+    def __init__(self, db: Database, players: PlayerService, ledger: LedgerService | None = None):
+        self.db = db
+        self.players = players
+        self.ledger = ledger
+
+    async def list_currencies(self) -> dict[int, str]:
+        rows = await self.db.fetch_all("SELECT id, name FROM currencies ORDER BY id")
+        return {row["id"]: row["name"] for row in rows}
+
+    def _set_balances_on_commit(self, balances: list[tuple[Player, int, int]]) -> None:
+        # Players and the cache only see balances that committed; see
+        # ``PlayerService._set_coins_on_commit``.
+        if not balances:
+            return
+        cache = self.players.cache
+
+        def apply() -> None:
+            for player, currency_id, amount in balances:
+                player.wallet[currency_id] = amount
+                cache.put(player.discord_id, player)
+
+        self.db.after_commit(apply)
+
+    def _record(self, changes: list[tuple[int, int, int]], reason: str) -> None:
+        if self.ledger is not None and changes:
+            ledger = self.ledger
+
+            def record() -> None:
+                for user_id, currency_id, amount in changes:
+                    ledger.record(user_id, amount, reason, currency_id=currency_id)
+
+            self.db.after_commit(record)
+
+    async def credit(self, player: Player, amounts: Mapping[int, int], *, reason: str) -> None:
+        await self.credit_many([(player, amounts)], reason=reason)
+
+    async def credit_many(
+        self,
+        credits: Sequence[tuple[Player, Mapping[int, int]]],
+        *,
+        reason: str,
+    ) -> None:
+        """Credit several players at once: one statement per batch, one commit.
+
+        Raises ``InvalidReward`` before touching any balance if a currency
+        no longer exists.
+        """
+        coins: list[tuple[Player, int]] = []
+        totals: dict[tuple[int, int], int] = {}
+        players: dict[int, list[Player]] = {}
+        for player, amounts in credits:
+            for currency_id, amount in amounts.items():
+                if not amount:
+                    continue
+                if currency_id == COINS:
+                    coins.append((player, amount))
+                    continue
+                key = (player.id, currency_id)
+                totals[key] = totals.get(key, 0) + amount
+                players.setdefault(player.id, []).append(player)
+        if not coins and not totals:
+            return
+        await check_currencies(self.db, {currency_id for _, currency_id in totals})
+        async with self.db.transaction():
+            if coins:
+                await self.players.add_coins_bulk(coins, reason=reason)
+            balances: list[tuple[Player, int, int]] = []
+            keys = list(totals)
+            for start in range(0, len(keys), _BATCH_SIZE):
+                chunk = keys[start : start + _BATCH_SIZE]
+                rows = await self.db.execute_fetch_all(
+                    f"""
+                    INSERT INTO user_currencies (user_id, currency_id, amount)
+                    VALUES {", ".join(["(?, ?, ?)"] * len(chunk))}
+                    ON CONFLICT(user_id, currency_id) DO UPDATE SET amount = amount + excluded.amount
+                    RETURNING user_id, currency_id, amount
+                    """,
+                    *(value for key in chunk for value in (*key, totals[key])),
+                )
+                balances += [
+                    (player, row["currency_id"], row["amount"]) for row in rows for player in players[row["user_id"]]
+                ]
+            self._set_balances_on_commit(balances)
+            self._record([(user_id, currency_id, amount) for (user_id, currency_id), amount in totals.items()], reason)
+
+    async def debit(self, player: Player, amounts: Mapping[int, int], *, reason: str) -> bool:
+        """Deduct every amount, or nothing if any balance falls short."""
+        amounts = {currency_id: amount for currency_id, amount in amounts.items() if amount}
+        if not amounts:
+            return True
+        balances: list[tuple[Player, int, int]] = []
+        try:
+            async with self.db.transaction():
+                for currency_id, amount in amounts.items():
+                    if currency_id == COINS:
+                        if not await self.players.spend_coins(player, amount, reason=reason):
+                            raise InsufficientFunds
+                        continue
+                    row = await self.db.execute_fetch_one(
+                        """
+                        UPDATE user_currencies SET amount = amount - ?1
+                        WHERE user_id = ?2 AND currency_id = ?3 AND amount >= ?1
+                        RETURNING amount
+                        """,
+                        amount,
+                        player.id,
+                        currency_id,
+                    )
+                    if not row:
+                        raise InsufficientFunds
+                    balances.append((player, currency_id, row["amount"]))
+                self._set_balances_on_commit(balances)
+                self._record(
+                    [(player.id, currency_id, -amount) for currency_id, amount in amounts.items() if currency_id != COINS],
+                    reason,
+                )
+        except InsufficientFunds:
+            return False
+        return True
@@ -0,0 +1,321 @@
+"""Stat normalization shared by models, services and combat.
+
+Modifier payloads from classes, traits and items are compiled once, when the
+content is loaded, into multiplier vectors indexed by ``CANONICAL_STATS``.
+Combining a loadout is then a handful of tuple multiplications instead of
+per-key alias lookups and dict merges, and the result is a ``StatBlock``.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Mapping, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+if TYPE_CHECKING:
+    from .models import Player
+
+CANONICAL_STATS: tuple[str, ...] = (
+    "constitution",
+    "agility",
+    "defense",
+    "endurance",
+    "dantian_size",
+    "strength",
+    "spirit",
+)
+STAT_INDEX: dict[str, int] = {name: index for index, name in enumerate(CANONICAL_STATS)}
+
+STAT_ALIASES: dict[str, str] = {
+    "constitution": "constitution",
+    "hp": "constitution",
+    "agility": "agility",
+    "defense": "defense",
+    "endurance": "endurance",
+    "stamina": "endurance",
+    "attack": "strength",
+    "power": "strength",
+    "strength": "strength",
+    "dantian_size": "dantian_size",
+    "qi": "dantian_size",
+    "dantian": "dantian_size",
+    "spirit": "spirit",
+    "will": "spirit",
+    "magic": "spirit",
+    "mana": "spirit",
+    "intelligence": "spirit",
+}
+
+_IDENTITY_VECTOR = (1.0,) * len(CANONICAL_STATS)
+_ZERO_VECTOR = (0.0,) * len(CANONICAL_STATS)
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledModifiers:
+    """Multipliers for the canonical stats plus any non-canonical extras."""
+
+    vector: tuple[float, ...] = _IDENTITY_VECTOR
+    extras: Mapping[str, float] = field(default_factory=dict)
+
+    def combine(self, other: CompiledModifiers) -> CompiledModifiers:
+        vector = tuple(a * b for a, b in zip(self.vector, other.vector))
+        if not other.extras:
+            return CompiledModifiers(vector, self.extras)
+        extras = dict(self.extras)
+        for key, value in other.extras.items():
+            extras[key] = extras.get(key, 1.0) * value
+        return CompiledModifiers(vector, extras)
+
+
+IDENTITY = CompiledModifiers()
+
+
+def scale_modifiers(multipliers: CompiledModifiers, base: float) -> StatBlock:
+    """Turn combined multipliers into final stats with a single multiply."""
+    extras = {key: value * base for key, value in multipliers.extras.items()} if multipliers.extras else {}
+    return StatBlock._new(tuple([value * base for value in multipliers.vector]), extras)
+
+
+def canonical_stat(key: str) -> str:
+    return STAT_ALIASES.get(key, key)
+
+
+def compile_modifiers(modifiers: Mapping[str, float]) -> CompiledModifiers:
+    """Normalize a modifier payload such as ``{"hp": 1.2, "attack": 1.1}``."""
+    if not modifiers:
+        return IDENTITY
+    vector = list(_IDENTITY_VECTOR)
+    extras: dict[str, float] = {}
+    for key, value in modifiers.items():
+        canonical = canonical_stat(key)
+        index = STAT_INDEX.get(canonical)
+        if index is None:
+            extras[canonical] = extras.get(canonical, 1.0) * float(value)
+        else:
+            vector[index] *= float(value)
+    return CompiledModifiers(tuple(vector), extras)
+
+
+def compile_multipliers(*multipliers: float) -> CompiledModifiers:
+    """Compile multipliers already given in ``CANONICAL_STATS`` order."""
+    return CompiledModifiers(tuple(float(value) for value in multipliers))
+
+
+def combine_all(parts: Iterable[CompiledModifiers]) -> CompiledModifiers:
+    combined = IDENTITY
+    for part in parts:
+        if part is not IDENTITY:
+            combined = combined.combine(part)
+    return combined
+
+
+def _stat_property(index: int) -> property:
+    return property(lambda self: self.values[index], doc=f"The {CANONICAL_STATS[index]} value.")
+
+
+class StatBlock:
+    """Stat values in ``CANONICAL_STATS`` order plus non-canonical extras.
+
+    A fixed-layout replacement for ``dict[str, float]`` stats. Canonical stats
+    live in a tuple, so party aggregation and scaling are plain elementwise
+    operations; keys outside the canonical set are kept in ``extras``.
+    """
+
+    __slots__ = ("values", "extras")
+
+    def __init__(self, values: Sequence[float] = _ZERO_VECTOR, extras: Mapping[str, float] | None = None) -> None:
+        if len(values) != len(CANONICAL_STATS):
+            raise ValueError(f"expected {len(CANONICAL_STATS)} stat values, got {len(values)}")
+        self.values: tuple[float, ...] = tuple(values)
+        self.extras: Mapping[str, float] = extras if extras is not None else {}
+
+    @classmethod
+    def _new(cls, values: tuple[float, ...], extras: Mapping[str, float]) -> StatBlock:
+        # Skips validation for values produced by the arithmetic below.
+        block = object.__new__(cls)
+        block.values = values
+        block.extras = extras
+        return block
+
+    constitution = _stat_property(0)
+    agility = _stat_property(1)
+    defense = _stat_property(2)
+    endurance = _stat_property(3)
+    dantian_size = _stat_property(4)
+    strength = _stat_property(5)
+    spirit = _stat_property(6)
+
+    @classmethod
+    def from_mapping(
+        cls,
+        stats: Mapping[str, Any],
+        defaults: Sequence[float] = _ZERO_VECTOR,
+    ) -> StatBlock:
+        """Resolve a loosely keyed payload, such as enemy stats, once.
+
+        Aliases like ``hp`` or ``attack`` map onto canonical stats, and an exact
+        canonical key wins over its aliases. Values that are not numeric fall
+        back to ``defaults``.
+        """
+        values = list(defaults)
+        extras: dict[str, float] = {}
+        # Aliases first so that exact canonical keys overwrite them.
+        ordered = sorted(stats.items(), key=lambda pair: pair[0] in STAT_INDEX)
+        for key, raw in ordered:
+            try:
+                value = float(raw)
+            except (TypeError, ValueError):
+                continue
+            canonical = canonical_stat(key)
+            index = STAT_INDEX.get(canonical)
+            if index is None:
+                extras[canonical] = value
+            else:
+                values[index] = value
+        return cls(values, extras)
+
+    @classmethod
+    def sum(cls, blocks: Iterable[StatBlock]) -> StatBlock:
+        blocks = list(blocks)
+        if not blocks:
+            return cls()
+        totals = tuple(map(sum, zip(*(block.values for block in blocks))))
+        extras: dict[str, float] = {}
+        for block in blocks:
+            for key, value in block.extras.items():
+                extras[key] = extras.get(key, 0.0) + value
+        return cls._new(totals, extras)
+
+    @property
+    def power(self) -> float:
+        """Offensive rating used by combat."""
+        values = self.values
+        return values[5] + values[6] + values[1] * 0.5 + values[3] * 0.25 + values[4] * 0.25
+
+    @property
+    def resilience(self) -> float:
+        """Defensive rating used by combat."""
+        return self.values[0] + self.values[2]
+
+    @property
+    def combat_power(self) -> float:
+        """Overall rating: offensive power plus resilience."""
+        return self.power + self.resilience
+
+    def get(self, key: str, default: float = 0.0) -> float:
+        canonical = canonical_stat(key)
+        index = STAT_INDEX.get(canonical)
+        if index is not None:
+            return self.values[index]
+        return self.extras.get(canonical, default)
+
+    def __getitem__(self, key: str) -> float:
+        canonical = canonical_stat(key)
+        index = STAT_INDEX.get(canonical)
+        if index is not None:
+            return self.values[index]
+        return self.extras[canonical]
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and (canonical_stat(key) in STAT_INDEX or canonical_stat(key) in self.extras)
+
+    def keys(self) -> Iterator[str]:
+        yield from CANONICAL_STATS
+        yield from self.extras
+
+    def items(self) -> Iterator[tuple[str, float]]:
+        yield from zip(CANONICAL_STATS, self.values)
+        yield from self.extras.items()
+
+    def as_dict(self) -> dict[str, float]:
+        return dict(self.items())
+
+    def __add__(self, other: object) -> StatBlock:
+        if isinstance(other, StatBlock):
+            values = tuple([a + b for a, b in zip(self.values, other.values)])
+            if not other.extras:
+                return StatBlock._new(values, self.extras)
+            extras = dict(self.extras)
+            for key, value in other.extras.items():
+                extras[key] = extras.get(key, 0.0) + value
+            return StatBlock._new(values, extras)
+        if other == 0:
+            # Lets the builtin ``sum`` start from its integer zero.
+            return self
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __mul__(self, other: object) -> StatBlock:
+        if isinstance(other, StatBlock):
+            values = tuple([a * b for a, b in zip(self.values, other.values)])
+            extras = {key: value * other.extras.get(key, 1.0) for key, value in self.extras.items()}
+            return StatBlock._new(values, extras)
+        if isinstance(other, (int, float)):
+            extras = {key: value * other for key, value in self.extras.items()} if self.extras else {}
+            return StatBlock._new(tuple([value * other for value in self.values]), extras)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, StatBlock):
+            return NotImplemented
+        return self.values == other.values and dict(self.extras) == dict(other.extras)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{key}={value:g}" for key, value in self.items())
+        return f"StatBlock({fields})"
+
+
+def compute_stats_matrix(players: Sequence[Player]) -> Any:
+    """Return an ``N x 7`` matrix of canonical stats, one row per player.
+
+    With NumPy installed the class, trait and item multiplier vectors of every
+    player are gathered into matrices and multiplied in bulk, then scaled by
+    each player's Lurkr level, and an ``ndarray`` is returned. Without NumPy
+    this falls back to ``Player.calculate_stats`` and returns a list of rows.
+    Non-canonical extras are not included.
+    """
+    if np is None:
+        return [list(player.calculate_stats().values) for player in players]
+
+    width = len(CANONICAL_STATS)
+    count = len(players)
+    if not count:
+        return np.empty((0, width))
+    # Deduplicate content so each distinct class, trait or item vector is
+    # materialized once; rows then only carry small integer indices.
+    vector_index: dict[tuple[float, ...], int] = {_IDENTITY_VECTOR: 0}
+    class_rows = np.empty(count, dtype=np.intp)
+    owners: list[int] = []
+    parts: list[int] = []
+    levels = np.empty(count)
+    for row, player in enumerate(players):
+        levels[row] = max(1, player.lurkr_level)
+        vector = player.rpg_class.compiled.vector if player.rpg_class else _IDENTITY_VECTOR
+        class_rows[row] = vector_index.setdefault(vector, len(vector_index))
+        for content in (*player.traits, *player.items):
+            vector = content.compiled.vector
+            if vector is _IDENTITY_VECTOR:
+                continue
+            owners.append(row)
+            parts.append(vector_index.setdefault(vector, len(vector_index)))
+    vectors = np.array(list(vector_index), dtype=float)
+    multipliers = vectors[class_rows]
+    if parts:
+        np.multiply.at(multipliers, np.asarray(owners, dtype=np.intp), vectors[np.asarray(parts, dtype=np.intp)])
+    return multipliers * levels[:, None]
+
+
+def combat_power_column(matrix: Any) -> Any:
+    """Combat power for each row of a ``compute_stats_matrix`` result."""
+    if np is not None and isinstance(matrix, np.ndarray):
+        con, agi, dfn, end, dan, strength, spirit = matrix.T
+        return strength + spirit + agi * 0.5 + end * 0.25 + dan * 0.25 + con + dfn
+    return [StatBlock(row).combat_power for row in matrix]